@@ -1,10 +1,22 @@
 # Import necessary libraries
-from langchain_cohere import ChatCohere  # For interacting with Cohere's chat models
 from langchain_core.prompts import PromptTemplate  # For creating prompt templates
 from langchain_core.runnables import ConfigurableField  # For making model parameters configurable
 from dotenv import load_dotenv  # For loading environment variables from a .env file
+import asyncio  # For running batch jobs concurrently
+import csv  # For exporting batch timings as CSV
+import io  # For building export files in memory
+import json  # For exporting batch timings as JSON Lines
 import os  # For interacting with the operating system (e.g., getting environment variables)
+import threading  # For signalling cancellation to a running stream
+import time  # For measuring first-token latency and throughput
+from collections import deque  # For a rolling window of recent stream timings
 import streamlit as st  # For building the web application UI
+from common.async_streaming import AsyncIteratorStream  # For consuming chain.astream() with cancellation
+from common.clients import get_cohere_chat  # For the shared, connection-pooled Cohere client
+from common.llm_callbacks import get_metrics_handler  # For recording call latency, time to first token and tokens
+from common.rate_limiter import BATCH, INTERACTIVE  # For queueing batch jobs behind interactive stories
+from common.response_cache import make_cache_key  # For identifying identical story requests
+from common.single_flight import single_flight  # For sharing one upstream stream between identical requests
 
 # Load environment variables from the .env file
 load_dotenv()
@@ -13,20 +25,39 @@ load_dotenv()
 # It's crucial to set this in your .env file as COHERE_API_KEY="your_api_key_here"
 COHERE_API_KEY = os.getenv("COHERE_API_KEY")
 
-def intialize_llm_chain():
+# Model name and prompt template. Together with the temperature they identify a request,
+# so concurrent sessions asking for the same story share one upstream stream.
+MODEL = 'command-r-plus'
+PROMPT_TEMPLATE = """Based on the opening sentence given generate a creative story. Return only story No Other text.
+
+Opening Sentence: {opening_sentence}"""
+PROMPT_VERSION = "story-v1"
+
+# Batch mode: stories generated at the same time. Their request rate is paced by the
+# shared Cohere rate limiter, at batch priority.
+BATCH_MAX_CONCURRENCY = int(os.getenv("STORY_BATCH_CONCURRENCY", "4"))
+BATCH_MAX_JOBS = 10
+
+# Cache the chain so Streamlit reruns reuse it instead of rebuilding it on every interaction.
+@st.cache_resource
+def intialize_llm_chain(priority=INTERACTIVE):
     """
     Initializes and returns a LangChain LLM chain for story generation.
 
+    Args:
+        priority (int): The shared rate limiter's priority class for the chain's requests;
+            batch variants use BATCH so they queue behind interactive stories.
+
     The chain consists of:
     1. A PromptTemplate: Defines the structure of the input prompt for the LLM.
     2. A ChatCohere LLM: Uses Cohere's 'command-r-plus' model for text generation.
        The temperature is set to 0.5 by default and is made configurable.
     """
-    # Initialize the Cohere chat model
+    # Get the shared Cohere chat model from the client registry
     # 'command-r-plus' is the chosen model.
     # 'temperature' controls creativity (higher = more creative).
     # .configurable_fields() allows Streamlit users to override the temperature from the UI.
-    llm = ChatCohere(model='command-r-plus', temperature=0.5, streaming=True).configurable_fields(
+    llm = get_cohere_chat(model=MODEL, temperature=0.5, priority=priority, streaming=True).configurable_fields(
         temperature=ConfigurableField(
             id='cohere_temp',  # Unique ID for the configurable field
             name='cohere temperature',  # Display name in the UI (if used with Streamlit's config)
@@ -36,15 +67,107 @@ def intialize_llm_chain():
 
     # Define the prompt template for story generation
     # The '{opening_sentence}' placeholder will be replaced by user input.
-    prompt = PromptTemplate.from_template("""Based on the opening sentence given generate a creative story. Return only story No Other text.
-
-Opening Sentence: {opening_sentence}""")
+    prompt = PromptTemplate.from_template(PROMPT_TEMPLATE)
 
     # Create the LangChain expression language chain
     # The prompt's output is piped as input to the LLM.
-    chain = prompt | llm
+    # Every call through the chain is recorded in the shared metrics under this app's name.
+    chain = (prompt | llm).with_config(callbacks=[get_metrics_handler("ai_story_generator")])
     return chain
 
+# How a streamed story ended.
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+class StreamStats:
+    """
+    Process-wide streaming metrics: first-token latency, tokens/sec and tokens saved by cancellation.
+
+    Each streamed chunk is counted as one token, which matches how Cohere streams text deltas
+    closely enough for these metrics.
+    """
+
+    def __init__(self, window=100):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.tokens_streamed = 0
+        self.tokens_saved = 0
+        self._first_token_latencies = deque(maxlen=window)
+        self._tokens_per_sec = deque(maxlen=window)
+        self._completed_lengths = deque(maxlen=window)
+
+    def record(self, first_token_latency, tokens, elapsed, outcome):
+        with self._lock:
+            self.tokens_streamed += tokens
+            if first_token_latency is not None:
+                self._first_token_latencies.append(first_token_latency)
+            if tokens and elapsed > 0:
+                self._tokens_per_sec.append(tokens / elapsed)
+            if outcome == CANCELLED:
+                self.cancelled += 1
+                # Estimate what the rest of the story would have cost from recent complete stories.
+                if self._completed_lengths:
+                    average = sum(self._completed_lengths) / len(self._completed_lengths)
+                    self.tokens_saved += max(int(average) - tokens, 0)
+            elif outcome == FAILED:
+                # An upstream error saves nothing anyone chose to skip, so it is not counted as tokens saved.
+                self.failed += 1
+            else:
+                self.completed += 1
+                self._completed_lengths.append(tokens)
+
+    def summary(self):
+        with self._lock:
+            def mean(values):
+                return sum(values) / len(values) if values else 0.0
+            return {
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "first_token_latency": mean(self._first_token_latencies),
+                "tokens_per_sec": mean(self._tokens_per_sec),
+                "tokens_streamed": self.tokens_streamed,
+                "tokens_saved": self.tokens_saved
+            }
+
+# Cache the metrics so they are shared by every session in the process.
+@st.cache_resource
+def get_stream_stats():
+    return StreamStats()
+
+def track_stream(stream, stats, cancel_event):
+    """
+    Passes a story stream through while measuring it and honouring cancellation.
+
+    The stream is closed as soon as 'cancel_event' is set (a newer submission from
+    the same session) or the consumer stops reading (a rerun or a disconnect), which
+    cancels the upstream request. Timings are recorded in 'stats' either way.
+    """
+    start = time.perf_counter()
+    first_token_latency = None
+    tokens = 0
+    # Stays CANCELLED if a newer submission breaks the loop or the consumer closes this generator.
+    outcome = CANCELLED
+    try:
+        for chunk in stream:
+            if cancel_event.is_set():
+                break
+            if first_token_latency is None:
+                first_token_latency = time.perf_counter() - start
+            tokens += 1
+            yield chunk
+        else:
+            outcome = COMPLETED
+    except Exception:
+        outcome = FAILED
+        raise
+    finally:
+        stream.close()
+        stats.record(first_token_latency, tokens, time.perf_counter() - start, outcome)
+
 def generate_response(chain, opening_sentence, temp=0.5):
     """
     Generates a story using the provided LangChain chain and opening sentence.
@@ -56,21 +179,168 @@ def generate_response(chain, opening_sentence, temp=0.5):
 
     Returns:
         A stream of responses from the LLM, allowing for real-time display.
+        Sessions that submit the same opening sentence and temperature while a
+        story is still streaming receive the same stream instead of starting a new one.
     """
-    # Use chain.stream() for streaming responses, which improves user experience
-    # by showing text as it's generated.
+    # Use chain.astream() for streaming responses, which improves user experience
+    # by showing text as it's generated. Running it as an async task means the
+    # request can be cancelled mid-read once nobody is reading the story any more.
     # The 'config' dictionary is used to pass configurable parameters to the LLM,
     # in this case, overriding the 'cohere_temp' (temperature).
-    return chain.stream(
+    key = make_cache_key(MODEL, temp, PROMPT_TEMPLATE.format(opening_sentence=opening_sentence), PROMPT_VERSION)
+    return single_flight.stream(key, lambda: AsyncIteratorStream(lambda: chain.astream(
         input={"opening_sentence": opening_sentence},
         config={"configurable": {"cohere_temp": temp}}
+    )))
+
+async def stream_batch(chain, jobs, max_concurrency):
+    """
+    Generates several stories concurrently and yields their chunks as they arrive.
+
+    This applies the same bound as chain.abatch(jobs, config={"max_concurrency": ...}):
+    at most 'max_concurrency' jobs run at once. Each job uses chain.astream(), because
+    abatch() only returns finished stories and we want every variant to stream live.
+
+    Args:
+        chain: The initialized LangChain chain.
+        jobs (list): Dicts with 'opening_sentence' and 'temperature'.
+        max_concurrency (int): The maximum number of stories generated at once.
+
+    Yields:
+        tuple: (job index, event, value) where event is "start", "token", "error" or "done".
+    """
+    events = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_job(index, job):
+        async with semaphore:
+            await events.put((index, "start", time.perf_counter()))
+            try:
+                async for chunk in chain.astream(
+                    {"opening_sentence": job["opening_sentence"]},
+                    config={"configurable": {"cohere_temp": job["temperature"]}}
+                ):
+                    await events.put((index, "token", chunk.content))
+            except Exception as e:
+                await events.put((index, "error", str(e)))
+            await events.put((index, "done", time.perf_counter()))
+
+    tasks = [asyncio.create_task(run_job(index, job)) for index, job in enumerate(jobs)]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            event = await events.get()
+            if event[1] == "done":
+                remaining -= 1
+            yield event
+    finally:
+        # Stops the remaining jobs when the consumer goes away.
+        for task in tasks:
+            task.cancel()
+        # Wait for the cancelled jobs, so none is left pending when the event loop closes.
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def generate_batch(chain, jobs, max_concurrency=BATCH_MAX_CONCURRENCY):
+    """
+    Runs a batch of story jobs and returns a cancellable iterator over their events, see stream_batch().
+
+    Use a chain from intialize_llm_chain(priority=BATCH), so the jobs wait on the shared rate limiter behind interactive requests.
+    """
+    return AsyncIteratorStream(lambda: stream_batch(chain, jobs, max_concurrency))
+
+def export_batch(records):
+    """
+    Returns the per-job batch records as (CSV text, JSON Lines text).
+    """
+    fields = ["job", "opening_sentence", "temperature", "queued_s", "first_token_s", "total_s", "tokens", "characters", "error", "story"]
+    csv_buffer = io.StringIO()
+    writer = csv.DictWriter(csv_buffer, fieldnames=fields)
+    writer.writeheader()
+    writer.writerows(records)
+    jsonl = "\n".join(json.dumps(record, ensure_ascii=False) for record in records)
+    return csv_buffer.getvalue(), jsonl
+
+def run_batch(chain):
+    """
+    Batch mode UI: several (opening sentence, temperature) jobs, each streamed into its own column.
+    """
+    st.write("Generate several candidate stories at once. Each row is one job.")
+    jobs = st.data_editor(
+        [{"opening_sentence": "", "temperature": t} for t in (0.2, 0.4, 0.6, 0.8, 1.0)],
+        num_rows="dynamic",
+        column_config={
+            "opening_sentence": st.column_config.TextColumn("Opening sentence", width="large"),
+            "temperature": st.column_config.NumberColumn("Temperature", min_value=0.0, max_value=1.0, step=0.1)
+        },
+        key="batch_jobs"
     )
+    # Rows with an empty sentence reuse the first sentence, so one sentence fans out to many temperatures.
+    first_sentence = next((job["opening_sentence"] for job in jobs if (job.get("opening_sentence") or "").strip()), "")
+    jobs = [
+        {"opening_sentence": (job.get("opening_sentence") or "").strip() or first_sentence, "temperature": float(job.get("temperature") or 0.0)}
+        for job in jobs
+    ][:BATCH_MAX_JOBS]
+
+    if st.button("Generate variants", key="batch_generate"):
+        if not first_sentence:
+            st.error("Please provide at least one opening sentence.")
+        else:
+            per_row = min(len(jobs), 5)
+            columns = [column for start in range(0, len(jobs), per_row) for column in st.columns(per_row)]
+            placeholders = []
+            for index, (column, job) in enumerate(zip(columns, jobs)):
+                column.markdown(f"**#{index + 1} · temperature {job['temperature']:.1f}**")
+                placeholders.append(column.empty())
+
+            texts = [""] * len(jobs)
+            records = [
+                {"job": index + 1, **job, "queued_s": None, "first_token_s": None, "total_s": None,
+                 "tokens": 0, "characters": 0, "error": "", "story": ""}
+                for index, job in enumerate(jobs)
+            ]
+            started = {}
+            batch_start = time.perf_counter()
+            events = generate_batch(chain, jobs)
+            try:
+                for index, event, value in events:
+                    record = records[index]
+                    if event == "start":
+                        started[index] = value
+                        record["queued_s"] = round(value - batch_start, 3)
+                    elif event == "token":
+                        if record["first_token_s"] is None:
+                            record["first_token_s"] = round(time.perf_counter() - started[index], 3)
+                        record["tokens"] += 1
+                        texts[index] += value
+                        placeholders[index].markdown(texts[index])
+                    elif event == "error":
+                        record["error"] = value
+                        placeholders[index].error(value)
+                    elif event == "done":
+                        record["total_s"] = round(value - started[index], 3)
+            finally:
+                # Cancels the remaining jobs if Streamlit interrupts this run.
+                events.close()
+            for record, text in zip(records, texts):
+                record["story"] = text
+                record["characters"] = len(text)
+            st.session_state["batch_records"] = records
+            st.caption(f"{len(jobs)} variants in {time.perf_counter() - batch_start:.1f}s")
+
+    # Export the per-job timings of the last batch.
+    records = st.session_state.get("batch_records")
+    if records:
+        csv_text, jsonl_text = export_batch(records)
+        csv_col, jsonl_col = st.columns(2)
+        csv_col.download_button("⬇️ Batch timings (CSV)", data=csv_text, file_name="story_batch.csv", mime="text/csv")
+        jsonl_col.download_button("⬇️ Batch timings (JSONL)", data=jsonl_text, file_name="story_batch.jsonl", mime="application/jsonl")
 
 # --- Streamlit Application UI ---
 def run():
     # Initialize the LLM chain once when the application starts
     # This avoids re-initializing the model on every user interaction.
     chain = intialize_llm_chain()
+    stats = get_stream_stats()
 
     # Set the title of the Streamlit application
     st.title("Story Generator")
@@ -99,16 +369,39 @@ def run():
             if not opening_sentence.strip():
                 st.error("Please provide an opening sentence to generate a story.")
             else:
+                # A new submission supersedes whatever this session was still streaming.
+                previous = st.session_state.get("story_cancel")
+                if previous is not None:
+                    previous.set()
+                cancel_event = st.session_state["story_cancel"] = threading.Event()
                 try:
                     # Display a spinner while the story is being generated
                     with st.spinner("Generating story..."):
                         # Call the generate_response function and stream the output to Streamlit
-                        st.write_stream(
-                            generate_response(chain, opening_sentence, temp)
-                        )
+                        stream = track_stream(generate_response(chain, opening_sentence, temp), stats, cancel_event)
+                        try:
+                            st.write_stream(stream)
+                        finally:
+                            # Streamlit interrupts this run on a rerun or disconnect; closing the
+                            # stream here cancels the upstream request right away.
+                            stream.close()
                 except Exception as e:
                     # Display any errors that occur during generation
                     st.error(f"Error: {e}")
 
+    # Show streaming metrics and how many requests (across all apps in this process)
+    # were served by an already running call.
+    summary = stats.summary()
+    flight = single_flight.stats()
+    st.caption(
+        f"First token {summary['first_token_latency']:.2f}s avg · {summary['tokens_per_sec']:.1f} tokens/s · "
+        f"{summary['cancelled']} cancelled, ~{summary['tokens_saved']} tokens saved, {summary['failed']} failed · "
+        f"{flight['coalesced']} of {flight['requests']} requests shared an in-flight call"
+    )
+
+    # Batch mode for generating several candidate stories per opening sentence.
+    with st.expander("🧪 Batch variants", expanded=False):
+        run_batch(intialize_llm_chain(priority=BATCH))
+
 if __name__ == "__main__":
     run()
\ No newline at end of file
@@ -1,66 +1,47 @@
 import streamlit as st
+from dotenv import load_dotenv
+from common.app_registry import APP_PREWARM, APPS, find_app, load_app, prewarm
+from common.metrics import METRICS_PORT, metrics
+from common.metrics_panel import show_metrics_panel
 
 st.set_page_config(page_title="Multi-App Dashboard", layout="wide")
 
-# Sidebar navigation
-app_choice = st.sidebar.radio("All the Apps", ["Home", "Basic Text Generator", "AI Story Generator", "Text to Image Generator", "Knowledge Based Chatbot"])
+# Load the .env file once for every app.
+load_dotenv()
 
-# Home Page Content
-if app_choice == "Home":
-    st.title("🚀 Welcome to the Multi-App Dashboard")
-    st.write("Use the sidebar to navigate between different Generative AI tools built with Streamlit and LangChain.")
-
-    st.markdown("---")
-    
-    st.subheader("😄 Basic Text Generator")
-    st.write("""
-    A fun and interactive app that uses Cohere's AI to generate creative jokes based on any topic you provide.
-    Powered by LangChain and Streamlit, it delivers real-time humor with just one click.
-    """)
-    
-    st.markdown("---")
-
-    st.subheader("📖 AI Story Generator")
-    st.write("""
-    Generate creative and engaging stories from any opening sentence using Cohere's command-r-plus model with real-time streaming and adjustable creativity.
-    """)
+@st.cache_resource()
+def start_prewarm():
+    # Runs once per process; the apps themselves are only imported when opened.
+    return prewarm()
 
-    st.markdown("---")
+@st.cache_resource()
+def start_metrics_endpoint():
+    # Serves Prometheus metrics on http://<host>:METRICS_PORT/metrics, once per process.
+    return metrics.serve_prometheus(METRICS_PORT)
 
-    st.subheader("🎨 Free Text → Image Generator")
-    st.write("""
-    Turn your imagination into visuals using the ClipDrop Text-to-Image API. 
-    This interactive app lets you generate AI-powered images from any text prompt, 
-    offering a seamless and creative experience powered by Streamlit, Pillow, and secure API integration.
-    """)
-
-    st.markdown("---")
-    
-    st.subheader("📄 PDF Knowledge Base (RAG-powered)")
-    st.write("""
-    Ask questions directly from your PDFs using a Retrieval Augmented Generation (RAG) pipeline. 
-    This smart app processes any uploaded PDF and gives fact-based answers grounded strictly in the document’s content, 
-    powered by Cohere embeddings, vector search, and real-time streaming with LangChain and Streamlit.
-    """)
+if METRICS_PORT:
+    start_metrics_endpoint()
 
+# Sidebar navigation, built from the app registry so every label has an app behind it.
+app_choice = st.sidebar.radio("All the Apps", ["Home", *[app.label for app in APPS]])
 
+# Home Page Content
+if app_choice == "Home":
+    st.title("🚀 Welcome to the Multi-App Dashboard")
+    st.write("Use the sidebar to navigate between different Generative AI tools built with Streamlit and LangChain.")
 
-# AI Story Generator App
-elif app_choice == "AI Story Generator":
-    from ai_story_generator import ai_story_generator
-    ai_story_generator.run()
+    for app in APPS:
+        st.markdown("---")
+        st.subheader(app.heading)
+        st.write(app.description)
 
-# Basic Text Generator App
-elif app_choice == "Basic Text Generator":
-    from basic_text_generator import basic_text_generator
-    basic_text_generator.run()
+# The selected app, imported on first use.
+else:
+    load_app(find_app(app_choice)).run()
 
-# Text to Image Generator App
-elif app_choice == "Text to Image Generator":
-    from text_to_image_generator import text_to_image_generator
-    text_to_image_generator.run()
+# Debug panel with latency percentiles for every app's model and API calls.
+with st.sidebar.expander("📈 Call metrics"):
+    show_metrics_panel()
 
-# Knowledge Based Chatbot App
-elif app_choice == "Knowledge Based Chatbot App":
-    from knowledge_based_chatbot import knowledge_based_chatbot
-    knowledge_based_chatbot.run()
\ No newline at end of file
+if APP_PREWARM:
+    start_prewarm()
@@ -1,14 +1,24 @@
-from langchain_cohere import ChatCohere # Import ChatCohere for interacting with Cohere's language models.
 from langchain_core.prompts import PromptTemplate # Import PromptTemplate to define the structure of prompts.
 from dotenv import load_dotenv # Import load_dotenv to load environment variables from a .env file.
 import os # Import the os module to access environment variables.
 import streamlit as st # Import streamlit for creating the web application UI.
+from common.clients import get_cohere_chat # Import the shared, connection-pooled Cohere client registry.
+from common.llm_callbacks import get_metrics_handler # Import the handler that records call latency and tokens.
+from common.response_cache import ResponseCache, make_cache_key # Import the shared LLM response cache.
+from common.single_flight import single_flight # Import the process-wide request coalescer.
 
 # Load environment variables from the .env file.
 # This is crucial for securely loading the COHERE_API_KEY without hardcoding it.
 load_dotenv()
 COHERE_API_KEY = os.getenv("COHERE_API_KEY") # Retrieve the Cohere API key from environment variables.
 
+# Model settings and prompt. They are part of the response cache key; bump PROMPT_VERSION
+# whenever the prompt changes so previously cached jokes are no longer served.
+MODEL = "command-r-plus"
+TEMPERATURE = 0.5
+PROMPT_TEMPLATE = "Write a joke about {topic}"
+PROMPT_VERSION = "joke-v1"
+
 # Decorator to cache the resource. This ensures that the LLM chain is initialized only once
 # when the application starts, improving performance and avoiding redundant calls to Cohere.
 @st.cache_resource()
@@ -17,40 +27,67 @@ def intialize_llm_chain():
     Initializes and returns a LangChain LLM (Large Language Model) chain.
     The chain consists of a Cohere model and a prompt template.
     """
-    # Initialize the ChatCohere model.
+    # Get the shared ChatCohere model from the client registry.
     # 'command-r-plus' is specified as the model.
     # 'temperature=0.5' controls the creativity of the model's responses (lower means more deterministic).
-    llm = ChatCohere(model='command-r-plus', temperature=0.5)
+    llm = get_cohere_chat(model=MODEL, temperature=TEMPERATURE)
 
     # Define a prompt template.
     # The '{topic}' is a placeholder that will be filled with the user's input.
-    prompt = PromptTemplate.from_template("Write a joke about {topic}")
+    prompt = PromptTemplate.from_template(PROMPT_TEMPLATE)
 
     # Create an LLM chain by piping the prompt template to the language model.
     # This means the prompt will be formatted, then sent to the LLM.
-    chain = prompt | llm
+    # Every call through the chain is recorded in the shared metrics under this app's name.
+    chain = (prompt | llm).with_config(callbacks=[get_metrics_handler("basic_text_generator")])
     return chain
 
-def generate_response(chain, topic):
+# Decorator to cache the resource. One response cache (and its SQLite connection settings)
+# is shared by every session in the process.
+@st.cache_resource()
+def get_response_cache():
+    """
+    Returns the shared response cache used to avoid repeating identical LLM calls.
+    """
+    return ResponseCache()
+
+def generate_response(chain, topic, cache=None, use_cache=True):
     """
     Generates a joke using the initialized LLM chain and the provided topic.
 
     Args:
         chain: The LangChain LLM chain ready to invoke.
         topic: The topic for which to generate a joke.
+        cache (ResponseCache, optional): Serves repeated requests for the same rendered prompt.
+        use_cache (bool): False always asks the model for a fresh joke.
 
     Returns:
         The content of the generated joke as a string.
     """
-    # Invoke the LLM chain with the given topic.
-    # The 'invoke' method sends the formatted prompt to the LLM and gets a response.
-    output = chain.invoke({"topic": topic})
-    return output.content # Return only the text content of the LLM's output.
+    def invoke():
+        # Invoke the LLM chain with the given topic.
+        # The 'invoke' method sends the formatted prompt to the LLM and gets a response.
+        output = chain.invoke({"topic": topic})
+        return output.content # Return only the text content of the LLM's output.
+
+    # The key covers the model, temperature, rendered prompt and prompt version.
+    key = make_cache_key(MODEL, TEMPERATURE, PROMPT_TEMPLATE.format(topic=topic), PROMPT_VERSION)
+    if not use_cache:
+        return invoke() # A fresh sample was asked for, so do not share another session's joke either.
+
+    def coalesced_invoke():
+        # Sessions asking for the same joke at the same moment share one Cohere request.
+        return single_flight.do(key, invoke)
+
+    if cache is None:
+        return coalesced_invoke()
+    return cache.get_or_call(key, coalesced_invoke)
 
 def run():
     # Initialize the LLM chain globally when the script runs.
     # This uses the cached function, so it's efficient.
     chain = intialize_llm_chain()
+    cache = get_response_cache()
 
     # Set the title of the Streamlit application.
     st.title("Jokes Generator")
@@ -60,6 +97,8 @@ def run():
     with st.form("topic_form"): # Assign a unique key to the form.
         # Text input field for the user to enter a topic.
         topic = st.text_input("Enter a topic: ", key="topic_input") # Assign a unique key to the text input.
+        # Unticking this always asks the model for a new joke instead of reusing a cached one.
+        use_cache = st.checkbox("Reuse previous jokes for the same topic", value=True, key="use_cache")
 
         # Submit button for the form.
         submit_btn = st.form_submit_button("Generate")
@@ -69,12 +108,20 @@ def run():
             # Use a try-except block for error handling, especially for API calls.
             try:
                 # Generate the joke using the chain and the user-provided topic.
-                joke = generate_response(chain, topic)
+                joke = generate_response(chain, topic, cache, use_cache)
                 # Display the generated joke in the Streamlit app.
                 st.write(joke)
             except Exception as e:
                 # If an error occurs during joke generation (e.g., API issues), display an error message.
                 st.error(f"Error: {e}")
 
+    # Show how effective the response cache has been so far.
+    stats = cache.stats()
+    flight = single_flight.stats()
+    st.caption(
+        f"Response cache: {stats['hit_ratio']:.0%} hit ratio, {stats['saved_seconds']:.1f}s of model latency saved · "
+        f"{flight['coalesced']} of {flight['requests']} requests coalesced"
+    )
+
 if __name__ == "__main__":
     run()
\ No newline at end of file
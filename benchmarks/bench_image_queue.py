@@ -0,0 +1,52 @@
+"""
+Benchmark for the image generation job queue against a local fake ClipDrop server.
+
+Submits a batch of prompts to ImageJobQueue at several worker counts, with a
+share of requests rate limited by the fake server, and reports wall time,
+retries, the highest observed concurrency, and whether every job succeeded.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_image_queue --prompts 20 --workers 1 2 4 --rate-limit 0.2
+"""
+import argparse # For parsing command line options.
+import time # For timing each run.
+from benchmarks.fake_clipdrop_server import FakeClipDropServer
+from common.clients import get_clipdrop_session
+from text_to_image_generator.job_queue import DONE, ImageJobQueue
+
+def generate_with(url):
+    def generate(prompt, use_cache):
+        resp = get_clipdrop_session().post(f"{url}/text-to-image/v1", files={"prompt": (None, prompt)}, timeout=60)
+        resp.raise_for_status()
+        return resp.content, False
+    return generate
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=20, help="number of prompts to submit")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts to try")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake server seconds per image")
+    parser.add_argument("--rate-limit", type=float, default=0.2, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429 responses")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'seconds':>8} {'done':>5} {'retries':>8} {'max in flight':>14}")
+    for workers in args.workers:
+        server = FakeClipDropServer(("127.0.0.1", 0), args.latency, args.rate_limit, args.retry_after, size=64, seed=0).start()
+        queue = ImageJobQueue(generate_with(server.url), max_workers=workers, max_retries=8, backoff_base=0.1, backoff_cap=2.0)
+        try:
+            start = time.perf_counter()
+            job_ids = [queue.submit(f"prompt {i}") for i in range(args.prompts)]
+            while not all(job.finished for job in queue.jobs(job_ids)):
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            done = sum(job.status == DONE for job in queue.jobs(job_ids))
+            print(f"{workers:>7} {elapsed:>8.2f} {done:>5} {queue.stats()['retries']:>8} {server.max_in_flight:>14}")
+        finally:
+            queue.shutdown()
+            server.shutdown()
+            server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for PDF parsing and chunking in the knowledge base ingestion pipeline.
+
+Compares the single-process page iterator with the process-pool loader at
+increasing worker counts and checks that every run produces the same chunks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pdf_parsing manual.pdf --multiply 10 --workers 1 2 4 8
+"""
+import argparse # For parsing command line options.
+import os # For the CPU count and temporary file cleanup.
+import tempfile # For writing the enlarged benchmark PDF.
+import time # For timing each run.
+from langchain.text_splitter import RecursiveCharacterTextSplitter # For the single-process baseline splitter.
+from pypdf import PdfReader, PdfWriter # For building a larger document out of the input PDF.
+from knowledge_based_chatbot.ingestion import IngestStats, iter_pdf_chunks, iter_pdf_chunks_parallel
+from knowledge_based_chatbot.knowledge_based_chatbot import CHUNK_OVERLAP, CHUNK_SIZE
+
+def multiply_pdf(path, times):
+    """
+    Writes a temporary PDF containing the pages of 'path' repeated 'times' times.
+    """
+    reader = PdfReader(path)
+    writer = PdfWriter()
+    for _ in range(times):
+        for page in reader.pages:
+            writer.add_page(page)
+    handle, out_path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(handle, "wb") as f:
+        writer.write(f)
+    return out_path
+
+def fingerprint(chunks):
+    return [(c.metadata["page"], c.metadata["chunk_index"], c.page_content) for c in chunks]
+
+def timed(label, make_chunks, repeat):
+    best, chunks, stats = None, None, None
+    for _ in range(repeat):
+        stats = IngestStats()
+        start = time.perf_counter()
+        chunks = list(make_chunks(stats))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return label, best, stats.pages, chunks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF file to parse")
+    parser.add_argument("--multiply", type=int, default=1, help="repeat the document's pages N times to simulate a bigger PDF")
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts to try (default: powers of two up to the CPU count)")
+    parser.add_argument("--pages-per-task", type=int, default=16, help="pages handed to a worker at a time")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per configuration; the fastest is reported")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({1, *[2 ** i for i in range(1, cpus.bit_length()) if 2 ** i <= cpus], cpus})
+    path = multiply_pdf(args.pdf, args.multiply) if args.multiply > 1 else args.pdf
+
+    try:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        runs = [timed("serial", lambda stats: iter_pdf_chunks(path, splitter, stats), args.repeat)]
+        for count in workers:
+            runs.append(timed(
+                f"{count} proc",
+                lambda stats, count=count: iter_pdf_chunks_parallel(
+                    path, CHUNK_SIZE, CHUNK_OVERLAP, stats, max_workers=count, pages_per_task=args.pages_per_task
+                ),
+                args.repeat
+            ))
+    finally:
+        if path != args.pdf:
+            os.remove(path)
+
+    baseline_label, baseline_time, _, baseline_chunks = runs[0]
+    expected = fingerprint(baseline_chunks)
+    print(f"{'loader':>10} {'seconds':>9} {'pages/s':>9} {'chunks/s':>10} {'speedup':>8}  same chunks")
+    for label, seconds, pages, chunks in runs:
+        same = fingerprint(chunks) == expected
+        print(f"{label:>10} {seconds:9.3f} {pages / seconds:9.1f} {len(chunks) / seconds:10.1f} "
+              f"{baseline_time / seconds:7.2f}x  {'yes' if same else 'NO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Offline load test of every app pipeline with fake model, embedding and image backends.
+
+Swaps the Cohere and Gemini clients for benchmarks.fakes (configurable time to
+first token and token rate) and points ClipDrop at the local fake server, then
+drives each pipeline headlessly at increasing concurrency and reports
+throughput, latency percentiles, time to first token for streamed answers,
+and the process's peak RSS. No API keys or credits are used; everything the
+pipelines write goes to a temporary directory.
+
+Scenarios: joke, story, rag-ingest, rag-query, codedoc, codedoc2, image.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pipelines --concurrency 1 4 16 --requests 32 --latency 0.3 --tokens-per-second 40
+"""
+import argparse # For parsing command line options.
+import itertools # For numbering generated documents.
+import os # For the temporary working directory.
+import resource # For the peak resident set size.
+import sys # For keeping the repository importable after changing directory.
+import tempfile # For isolating everything the pipelines write.
+import time # For timing requests.
+from concurrent.futures import ThreadPoolExecutor # For concurrent requests.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import install_fakes, write_text_pdf
+from common.metrics import percentile
+
+SCENARIOS = ("joke", "story", "rag-ingest", "rag-query", "codedoc", "codedoc2", "image")
+SAMPLE_CODE = os.path.join(ROOT, "knowledge_based_chatbot", "bm25_index.py")
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def setup_joke(args):
+    from basic_text_generator import basic_text_generator as app
+    chain = app.intialize_llm_chain()
+
+    def run(i):
+        # Distinct topics and no cache, so every request reaches the model.
+        app.generate_response(chain, f"topic {i}", cache=None, use_cache=False)
+    return run
+
+def setup_story(args):
+    from ai_story_generator import ai_story_generator as app
+    chain = app.intialize_llm_chain()
+
+    def run(i):
+        start = time.perf_counter()
+        ttft = None
+        for _ in app.generate_response(chain, f"Once upon a time, request {i} began.", temp=0.7):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+        return ttft
+    return run
+
+def setup_rag(args, ingest):
+    from knowledge_based_chatbot import knowledge_based_chatbot as app
+    from knowledge_based_chatbot.context_builder import build_context
+
+    def ingest_pdf(seed):
+        path = write_text_pdf(os.path.join("pdfs", f"doc-{seed}.pdf"), pages=args.pages, seed=seed)
+        with open(path, "rb") as f:
+            doc_hash = app.compute_doc_hash(f.read())
+        # The cached helpers are called through __wrapped__ so every run really ingests.
+        db = app.get_vectorstore.__wrapped__(doc_hash, path, app.RETRIEVER_BACKEND)
+        return doc_hash, db, app.BM25Index.load(app.get_bm25_path(doc_hash))
+
+    os.makedirs("pdfs", exist_ok=True)
+    if ingest:
+        seeds = itertools.count(1)
+
+        def run(i):
+            # A new document every time, also across concurrency levels, so no store is reused.
+            ingest_pdf(next(seeds))
+        return run
+
+    doc_hash, db, bm25 = ingest_pdf(0)
+    chain = app.get_chain()
+    embeddings = app.get_embeddings()
+
+    def query(i):
+        start = time.perf_counter()
+        question = f"What does ERR-{(i * 10) % 1000:04d} mean for the river engine?"
+        query_embedding = embeddings.embed_query(question)
+        candidates = app.hybrid_search(db, bm25, question, query_embedding, doc_hash[:16])
+        context_text, _ = build_context(candidates, app.CONTEXT_TOKEN_BUDGET, app.CHUNK_OVERLAP, app.MMR_LAMBDA)
+        ttft = None
+        for _ in chain.stream({"query": question, "context": context_text}):
+            if ttft is None:
+                ttft = time.perf_counter() - start
+        return ttft
+    return query
+
+def setup_codedoc(args):
+    from code_to_comment_readme_summary.langgraph_components.graph_builder import build_graph
+    graph = build_graph()
+    with open(SAMPLE_CODE) as f:
+        code = f.read()
+
+    def run(i):
+        # The cache would answer every request after the first, since only a comment differs.
+        graph.invoke({"messages": [{"role": "user", "content": f"# request {i}\n{code}"}], "use_cache": False})
+    return run
+
+def setup_codedoc2(args):
+    # The app builds its graph at import time (its Streamlit calls are no-ops outside 'streamlit run').
+    from code_to_comment_readme_summary_2 import code_to_comment_readme_summary as app
+    with open(SAMPLE_CODE) as f:
+        code = f.read()
+
+    def run(i):
+        app.graph.invoke({"messages": [{"role": "user", "content": f"# request {i}\n{code}"}]})
+    return run
+
+def setup_image(args):
+    from benchmarks.fake_clipdrop_server import FakeClipDropServer
+    from text_to_image_generator import text_to_image_generator as app
+    server = FakeClipDropServer(("127.0.0.1", 0), latency=args.image_latency, size=512).start()
+
+    def run(i):
+        app.generate_clipdrop(f"a lighthouse, variant {i}", cache=None, base_url=server.url)
+    return run
+
+def setup(name, args):
+    if name == "joke":
+        return setup_joke(args)
+    if name == "story":
+        return setup_story(args)
+    if name in ("rag-ingest", "rag-query"):
+        return setup_rag(args, ingest=name == "rag-ingest")
+    if name == "codedoc":
+        return setup_codedoc(args)
+    if name == "codedoc2":
+        return setup_codedoc2(args)
+    return setup_image(args)
+
+def run_level(run, concurrency, requests):
+    """
+    Runs 'requests' calls of run(i) with 'concurrency' threads and returns the measurements.
+    """
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            ttft = run(i)
+            return time.perf_counter() - start, ttft, None
+        except Exception as e:
+            return time.perf_counter() - start, None, e
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - start
+    latencies = [latency for latency, _, error in results if error is None]
+    ttfts = [ttft for _, ttft, error in results if error is None and ttft is not None]
+    errors = [error for _, _, error in results if error is not None]
+    return wall, latencies, ttfts, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8], help="concurrent requests to try")
+    parser.add_argument("--requests", type=int, default=16, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake model seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="fake model token rate")
+    parser.add_argument("--reply-tokens", type=int, default=60, help="tokens per fake reply")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="fake embedding seconds per call")
+    parser.add_argument("--image-latency", type=float, default=0.5, help="fake ClipDrop seconds per image")
+    parser.add_argument("--pages", type=int, default=20, help="pages per generated PDF for the RAG scenarios")
+    args = parser.parse_args()
+
+    install_fakes(args.latency, args.tokens_per_second, args.reply_tokens, args.embed_latency)
+    workdir = tempfile.mkdtemp(prefix="genai-bench-")
+    os.chdir(workdir) # The apps write data/ and temp/ relative to the working directory.
+    print(f"Working directory: {workdir}")
+
+    header = f"{'scenario':<11} {'conc':>4} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttft p50':>9} {'errors':>6} {'peak RSS MB':>12}"
+    print(header)
+    for name in args.scenarios:
+        try:
+            run = setup(name, args)
+        except Exception as e:
+            print(f"{name:<11} setup failed: {type(e).__name__}: {e}")
+            continue
+        for concurrency in args.concurrency:
+            wall, latencies, ttfts, errors = run_level(run, concurrency, args.requests)
+
+            def ms(values, q):
+                value = percentile(values, q)
+                return f"{value * 1000:.0f}" if value is not None else "-"
+
+            print(
+                f"{name:<11} {concurrency:>4} {len(latencies) / wall:>7.2f} {ms(latencies, 0.5):>8} {ms(latencies, 0.95):>8} "
+                f"{ms(latencies, 0.99):>8} {ms(ttfts, 0.5):>9} {len(errors):>6} {peak_rss_mb():>12.0f}"
+            )
+            if errors:
+                print(f"{'':<11} first error: {type(errors[0]).__name__}: {errors[0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Startup benchmark for the multi-app dashboard.
+
+For the dashboard itself and every app in the registry, imports the module in
+a fresh interpreter with -X importtime, and reports the cold import time and
+the top-level packages that dominate it. With --navigate it also drives
+all_apps.py through Streamlit's AppTest and times the first and the second
+visit of every app, i.e. first-navigation latency and warm reruns.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --top 8 --repeat 3 --navigate
+"""
+import argparse # For parsing command line options.
+import os # For the subprocess environment.
+import subprocess # For importing each module in a fresh interpreter.
+import sys # For the interpreter path.
+import time # For timing navigation.
+from common.app_registry import APPS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def importtime(module):
+    """
+    Imports 'module' in a fresh interpreter and returns (total seconds, {top-level package: self seconds}).
+    """
+    env = {**os.environ, "APP_PREWARM": "0"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total, packages = 0.0, {}
+    for line in result.stderr.splitlines():
+        # Lines look like: "import time:       512 |       1834 |   langchain_core.runnables"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1e6
+        if name == module:
+            total = int(cumulative_us) / 1e6
+    return total, packages
+
+def report_imports(modules, top, repeat):
+    for module in modules:
+        try:
+            runs = [importtime(module) for _ in range(repeat)]
+        except RuntimeError as e:
+            print(f"\n{module}: import failed ({e})")
+            continue
+        total, packages = min(runs, key=lambda run: run[0])
+        print(f"\n{module}: {total * 1000:.0f} ms cold import (best of {repeat})")
+        for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            print(f"  {package:<32} {seconds * 1000:>8.1f} ms")
+
+def report_navigation():
+    os.environ["APP_PREWARM"] = "0" # Measure what a visitor pays without the background prewarm.
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(os.path.join(ROOT, "all_apps.py"), default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    print(f"\n{'page':<28} {'first visit':>12} {'second visit':>13}")
+    print(f"{'Home':<28} {(time.perf_counter() - start) * 1000:>10.0f}ms")
+    for spec in APPS:
+        timings = []
+        for _ in range(2):
+            app.sidebar.radio[0].set_value(spec.label)
+            start = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - start)
+        failed = " (raised an exception)" if app.exception else ""
+        print(f"{spec.label:<28} {timings[0] * 1000:>10.0f}ms {timings[1] * 1000:>11.0f}ms{failed}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=8, help="heaviest top-level packages to list per module")
+    parser.add_argument("--repeat", type=int, default=3, help="imports per module; the fastest is reported")
+    parser.add_argument("--navigate", action="store_true", help="also time page navigation with Streamlit's AppTest")
+    args = parser.parse_args()
+
+    report_imports(["streamlit", "common.app_registry", *[app.module for app in APPS]], args.top, args.repeat)
+    if args.navigate:
+        report_navigation()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+A local stand-in for the ClipDrop text-to-image API.
+
+Answers POST /text-to-image/v1 with a small solid-colour PNG after a fixed
+latency, and can be told to rate limit a share of requests with 429 and a
+Retry-After header, so the image job queue can be exercised without an API key
+or credits.
+
+Run from the repository root and point the app at it:
+
+    python -m benchmarks.fake_clipdrop_server --port 8765 --rate-limit 0.3
+    CLIPDROP_URL=http://127.0.0.1:8765 streamlit run all_apps.py
+"""
+import argparse # For parsing command line options.
+import hashlib # For deriving the image colour from the prompt.
+import random # For deciding which requests are rate limited.
+import struct # For writing PNG chunks.
+import threading # For running the server in the background of a benchmark.
+import time # For simulated latency.
+import zlib # For PNG compression and checksums.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # For the HTTP server.
+
+def make_png(width, height, rgb):
+    """
+    Returns the bytes of a solid-colour RGB PNG.
+    """
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    row = b"\x00" + bytes(rgb) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+class FakeClipDropServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server with the fake API's settings and request counters.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.5, rate_limit=0.0, retry_after=1, size=512, seed=None):
+        super().__init__(address, FakeClipDropHandler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.size = size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serves in a background thread and returns the server.
+        """
+        threading.Thread(target=self.serve_forever, name="fake-clipdrop", daemon=True).start()
+        return self
+
+class FakeClipDropHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real API.
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/text-to-image/v1":
+            return self._reply(404, b"not found", "text/plain")
+        with server.lock:
+            server.requests += 1
+            limited = server.random.random() < server.rate_limit
+            if limited:
+                server.rate_limited += 1
+                return self._reply(429, b'{"error": "Too many requests"}', "application/json", {"Retry-After": str(server.retry_after)})
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            rgb = hashlib.sha256(body).digest()[:3]
+            self._reply(200, make_png(server.size, server.size, rgb), "image/png")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _reply(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per successful request")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429 responses")
+    parser.add_argument("--size", type=int, default=512, help="width and height of the returned images")
+    args = parser.parse_args()
+
+    server = FakeClipDropServer((args.host, args.port), args.latency, args.rate_limit, args.retry_after, args.size)
+    print(f"Fake ClipDrop API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Deterministic offline stand-ins for the paid APIs, for benchmarks and load tests.
+
+FakeChatModel implements LangChain's chat model interface (invoke, stream,
+astream) with a configurable time to first token and token rate, and answers
+in the formats the code documentation graphs parse. FakeEmbeddings returns
+hashed bag-of-words vectors, so similar texts get similar vectors.
+install_fakes() makes the shared client registry hand these out in place of
+ChatCohere, init_chat_model() models and CohereEmbeddings.
+"""
+import asyncio # For the async streaming path.
+import hashlib # For deterministic replies and embeddings.
+import math # For normalizing embeddings.
+import re # For tokenizing text.
+import time # For simulated latency.
+from langchain_core.embeddings import Embeddings # For the fake embeddings interface.
+from langchain_core.language_models.chat_models import BaseChatModel # For the fake chat model interface.
+from langchain_core.messages import AIMessage, AIMessageChunk # For replies.
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult # For replies.
+from common.clients import registry
+
+WORDS = (
+    "the a river lantern quietly engine orbit forest signal memory harbor copper whisper "
+    "archive meadow circuit voyage ember glacier compass thunder velvet puzzle beacon"
+).split()
+
+def _seed(text):
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16)
+
+def fake_text(prompt, tokens):
+    """
+    Returns 'tokens' pseudo-random words, always the same for the same prompt.
+    """
+    seed = _seed(prompt)
+    return " ".join(WORDS[(seed >> (i % 48)) % len(WORDS) if i % 3 else (seed + i) % len(WORDS)] for i in range(tokens))
+
+def _content(message):
+    content = message.content
+    return content if isinstance(content, str) else str(content)
+
+class FakeChatModel(BaseChatModel):
+    """
+    A chat model that sleeps instead of calling an API.
+
+    Each reply waits 'latency' seconds before its first token and then produces
+    'tokens_per_second' tokens per second, for 'reply_tokens' tokens.
+    """
+    model: str = "fake-chat"
+    temperature: float = 0.5
+    latency: float = 0.2
+    tokens_per_second: float = 50.0
+    reply_tokens: int = 60
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _reply(self, messages):
+        system = next((_content(m) for m in messages if m.type == "system"), "")
+        user = _content(messages[-1]) if messages else ""
+        text = fake_text(user, self.reply_tokens)
+        if "===START_CODE_WITH_COMMENTS===" in system:
+            # The single-call documentation graph parses these delimiters.
+            return "\n".join([
+                "===START_CODE_WITH_COMMENTS===", f"# {text[:80]}", user, "===END_CODE_WITH_COMMENTS===",
+                "===START_README===", f"# Project\n\n{text}", "===END_README===",
+                "===START_SUMMARY===", text, "===END_SUMMARY==="
+            ])
+        if "triple backticks" in system:
+            # The commenting agent strips the first and last line of a fenced block.
+            return f"```python\n# {text[:80]}\n{user}\n```"
+        return text
+
+    def _tokens(self, messages):
+        return re.findall(r"\s*\S+", self._reply(messages)) or [""]
+
+    def _usage(self, messages, tokens):
+        tokens_in = sum(len(_content(m).split()) for m in messages)
+        return {"input_tokens": tokens_in, "output_tokens": len(tokens), "total_tokens": tokens_in + len(tokens)}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        time.sleep(self.latency)
+        for index, token in enumerate(tokens):
+            time.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, tokens) if index == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency)
+        for index, token in enumerate(tokens):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, tokens) if index == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings with a fixed per-call and per-text latency.
+    """
+
+    def __init__(self, dimensions=384, call_latency=0.05, text_latency=0.001):
+        self.dimensions = dimensions
+        self.call_latency = call_latency
+        self.text_latency = text_latency
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            seed = _seed(word)
+            vector[seed % self.dimensions] += 1.0 if seed & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        time.sleep(self.call_latency + self.text_latency * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.call_latency + self.text_latency)
+        return self._embed(text)
+
+def install_fakes(latency=0.2, tokens_per_second=50.0, reply_tokens=60, embed_latency=0.05):
+    """
+    Makes the shared client registry build fakes instead of Cohere and Gemini clients.
+
+    Call it before the apps build their chains; models keep the name and
+    temperature the app asked for, so metrics and configurable fields still work.
+    """
+    def chat(**config):
+        return FakeChatModel(
+            model=config.get("model", "fake-chat"), temperature=config.get("temperature", 0.5),
+            latency=latency, tokens_per_second=tokens_per_second, reply_tokens=reply_tokens
+        )
+    registry.override("cohere_chat", chat)
+    registry.override("google-genai_chat", chat)
+    registry.override("cohere_embeddings", lambda **config: FakeEmbeddings(call_latency=embed_latency))
+
+def write_text_pdf(path, pages=10, lines_per_page=40, seed=0):
+    """
+    Writes a plain PDF with 'pages' pages of deterministic text that pypdf can extract.
+
+    Some lines carry identifiers such as 'ERR-0042' so keyword search has something to find.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = []
+        for line in range(lines_per_page):
+            text = fake_text(f"{seed}-{page}-{line}", 12)
+            if line % 10 == 0:
+                text += f" ERR-{(page * lines_per_page + line) % 10000:04d}"
+            lines.append(f"({text}) Tj T*")
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
@@ -1,6 +1,18 @@
 import streamlit as st
 import os
-from langgraph_components.graph_builder import build_graph
+import sys
+import time
+
+# Make the repository's shared 'common' package importable when run from this folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.docs_cache import DocsCache, describe_stats, make_docs_key
+from langgraph_components.graph_builder import MODEL, build_graph
+from langgraph_components.nodes.comment_node import COMMENT_PROMPT_VERSION
+from langgraph_components.nodes.readme_node import README_PROMPT_VERSION
+from langgraph_components.nodes.summary_node import SUMMARY_PROMPT_VERSION
+from graph_stream import LiveRun
+from repo_batch import DONE, FAILED, PENDING, REPO_BATCH_CONCURRENCY, RepoBatch, read_directory, read_zip
 
 st.markdown("""
     <style>
@@ -17,6 +29,23 @@ def get_graph():
 
 graph = get_graph()
 
+@st.cache_resource
+def get_docs_cache():
+    return DocsCache()
+
+docs_cache = get_docs_cache()
+PROMPT_VERSIONS = {"comments": COMMENT_PROMPT_VERSION, "readme": README_PROMPT_VERSION, "summary": SUMMARY_PROMPT_VERSION}
+
+def write_docs_folder(key, docs):
+    # Cached documents get a folder named after their key, so repeated uploads reuse it.
+    folder_path = os.path.join("temp", f"project_{key[:8]}")
+    os.makedirs(folder_path, exist_ok=True)
+    outputs = {f"project_{key[:8]}.py": docs["code"], "README.md": docs["readme"], "summary.md": docs["summary"]}
+    for name, content in outputs.items():
+        with open(os.path.join(folder_path, name), "w") as f:
+            f.write(content)
+    return folder_path
+
 st.title("🧠 Python Code Comment, README & Summary Generator")
 
 if "folder_path" not in st.session_state:
@@ -25,52 +54,122 @@ if "folder_path" not in st.session_state:
 # Form section
 with st.form("code_form"):
     uploaded = st.file_uploader("Upload .py file", type="py", key="code_file_uploader")
+    use_cache = st.checkbox("Reuse cached results for unchanged code", value=True)
     submitted = st.form_submit_button("Generate")
 
-    if submitted and uploaded:
-        os.makedirs("temp", exist_ok=True)
-        temp_path = os.path.join("temp", uploaded.name)
-        with open(temp_path, "wb") as f:
-            f.write(uploaded.getbuffer())
-        with open(temp_path, "r") as f:
-            code = f.read()
+st.caption(describe_stats(docs_cache.stats()))
+
+# Output sections: session state key, expander label and heading for each branch of the graph
+SECTIONS = {
+    "comments_agent": ("commented_code", "🔍 View Commented Code", "📝 Commented Code"),
+    "readme_agent": ("readme_md", "📘 View Generated README", "📄 Generated README"),
+    "summary_agent": ("summary_md", "🧾 View Project Summary", "🧠 Summary")
+}
+# Seconds between redraws of a section while tokens arrive.
+LIVE_REFRESH_SECONDS = 0.25
+
+def section_note(node):
+    if node == "comments_agent":
+        report = st.session_state.get("comment_report")
+        if report and report["units"]:
+            note = f"Commented {report['units']} top-level units: {report['cached']} from cache, the rest in {report['chunks']} parallel requests."
+            if report["fallbacks"]:
+                note += f" {report['fallbacks']} section(s) kept their original code because the model's version did not match."
+            if not report["verified"]:
+                note += " The reassembled file did not match the original, so the uncommented code is shown."
+            return note
+    elif st.session_state.get("readme_cached" if node == "readme_agent" else "summary_cached"):
+        return "Served from cache: the module's public surface has not changed."
+    return None
+
+def timing_note(timing):
+    parts = []
+    if timing and timing.get("first_token") is not None:
+        parts.append(f"first token {timing['first_token']:.1f}s")
+    if timing and timing.get("seconds") is not None:
+        parts.append(f"done {timing['seconds']:.1f}s")
+    return "⏱️ " + " · ".join(parts) if parts else None
 
-        state = {"messages": [{"role": "user", "content": code}]}
+def render_section(node, slots, text, timing, final):
+    notes = [timing_note(timing), section_note(node) if final else None]
+    slots["caption"].caption(" — ".join(note for note in notes if note) or "⏳ waiting...")
+    if node == "comments_agent":
+        slots["body"].code(text, language="python")
+    else:
+        slots["body"].markdown(text)
 
-        with st.spinner("Generating comments, README, and summary..."):
-            result = graph.invoke(state)
+docs = None
+if submitted and uploaded:
+    os.makedirs("temp", exist_ok=True)
+    temp_path = os.path.join("temp", uploaded.name)
+    with open(temp_path, "wb") as f:
+        f.write(uploaded.getbuffer())
+    with open(temp_path, "r") as f:
+        code = f.read()
 
-        folder_path = result["folder_path"]
-        folder_name = os.path.basename(folder_path)
+    state = {"messages": [{"role": "user", "content": code}], "use_cache": use_cache, "module_name": uploaded.name}
+    docs_key = make_docs_key(code, MODEL, PROMPT_VERSIONS)
+    docs = docs_cache.get_docs(docs_key) if use_cache else None
 
-        # Read and store file contents
-        with open(os.path.join(folder_path, f"{folder_name}.py"), "r") as f:
-            st.session_state["commented_code"] = f.read()
-        with open(os.path.join(folder_path, "README.md"), "r") as f:
-            st.session_state["readme_md"] = f.read()
-        with open(os.path.join(folder_path, "summary.md"), "r") as f:
-            st.session_state["summary_md"] = f.read()
+    if docs is not None:
+        # A byte-identical file was documented before: no new folder and no model calls.
+        st.session_state["commented_code"] = docs["code"]
+        st.session_state["readme_md"] = docs["readme"]
+        st.session_state["summary_md"] = docs["summary"]
+        for key in ("comment_report", "readme_cached", "summary_cached", "branch_timings"):
+            st.session_state.pop(key, None)
+        st.session_state["folder_path"] = write_docs_folder(docs_key, docs)
+        st.success("Served from the documentation cache: this exact file was documented before.")
 
-        st.session_state["folder_path"] = folder_path
+if submitted and uploaded and docs is None:
+    # Each section fills in as its branch streams, instead of waiting for the slowest one.
+    slots = {}
+    for node, (_, label, heading) in SECTIONS.items():
+        with st.expander(label, expanded=True):
+            st.subheader(heading)
+            slots[node] = {"caption": st.empty(), "body": st.empty()}
+            slots[node]["caption"].caption("⏳ waiting...")
 
+    live = LiveRun(graph, state)
+    last_drawn = {}
+    for node in live.run():
+        branch = live.branches[node]
+        if not branch.done and time.perf_counter() - last_drawn.get(node, 0) < LIVE_REFRESH_SECONDS:
+            continue
+        last_drawn[node] = time.perf_counter()
+        if branch.done:
+            # The notes read the branch's report from the session state.
+            st.session_state["comment_report"] = live.result.get("comment_report")
+            st.session_state["readme_cached"] = live.result.get("readme_cached")
+            st.session_state["summary_cached"] = live.result.get("summary_cached")
+        timing = {"first_token": branch.first_token, "seconds": branch.seconds}
+        render_section(node, slots[node], branch.live_text(), timing, branch.done)
 
-# Display Commented Code
-if st.session_state.get("commented_code"):
-    with st.expander("🔍 View Commented Code", expanded=False):
-        st.subheader("📝 Commented Code")
-        st.code(st.session_state["commented_code"], language="python")
+    for node, (key, _, _) in SECTIONS.items():
+        st.session_state[key] = live.branches[node].text
+    st.session_state["branch_timings"] = {
+        node: {"first_token": branch.first_token, "seconds": branch.seconds} for node, branch in live.branches.items()
+    }
+    st.session_state["folder_path"] = live.result["folder_path"]
 
-# Display README
-if st.session_state.get("readme_md"):
-    with st.expander("📘 View Generated README", expanded=False):
-        st.subheader("📄 Generated README")
-        st.markdown(st.session_state["readme_md"])
+    report = live.result.get("comment_report") or {}
+    # Only complete, verified documentation is kept for identical uploads.
+    if report.get("verified") and all(branch.text is not None for branch in live.branches.values()):
+        docs_cache.set_docs(
+            docs_key,
+            {"code": st.session_state["commented_code"], "readme": st.session_state["readme_md"], "summary": st.session_state["summary_md"]},
+            max(branch.seconds for branch in live.branches.values())
+        )
 
-# Display Summary
-if st.session_state.get("summary_md"):
-    with st.expander("🧾 View Project Summary", expanded=False):
-        st.subheader("🧠 Summary")
-        st.markdown(st.session_state["summary_md"])
+# Earlier or cached results, shown again on every rerun
+else:
+    for node, (key, label, heading) in SECTIONS.items():
+        if st.session_state.get(key):
+            with st.expander(label, expanded=False):
+                st.subheader(heading)
+                slots = {"caption": st.empty(), "body": st.empty()}
+                timing = st.session_state.get("branch_timings", {}).get(node)
+                render_section(node, slots, st.session_state[key], timing, True)
 
 
 # Download Section
@@ -121,4 +220,69 @@ if st.session_state.get("folder_path"):
                     mime="text/markdown"
                 )
         else:
-            st.empty()
\ No newline at end of file
+            st.empty()
+
+
+# Repository batch mode
+def show_batch_table(batch, placeholder):
+    placeholder.dataframe(
+        [
+            {"File": path, "Status": record["status"], "Finished after (s)": record.get("finished_after"), "Error": record.get("error", "")}
+            for path, record in batch.files.items()
+        ],
+        use_container_width=True
+    )
+
+st.markdown("---")
+with st.expander("📦 Document a whole repository", expanded=False):
+    st.caption(
+        "Upload a .zip or enter a folder on this machine. Files run in parallel within the shared rate limits; "
+        "submitting the same repository again resumes it and only redoes unfinished or failed files."
+    )
+    with st.form("repo_form"):
+        archive_upload = st.file_uploader("Upload .zip", type="zip", key="repo_zip_uploader")
+        directory = st.text_input("...or a folder path")
+        # The configured value may exceed the usual maximum, which number_input would reject.
+        max_concurrency = st.number_input("Files at a time", min_value=1, max_value=max(16, REPO_BATCH_CONCURRENCY), value=REPO_BATCH_CONCURRENCY)
+        batch_use_cache = st.checkbox("Reuse cached results for unchanged code", value=True, key="repo_use_cache")
+        run_batch = st.form_submit_button("Document repository")
+
+    if run_batch and (archive_upload or directory):
+        if archive_upload:
+            sources, too_large = read_zip(archive_upload.getvalue())
+        elif os.path.isdir(directory):
+            sources, too_large = read_directory(directory)
+        else:
+            st.error(f"{directory} is not a folder.")
+            sources, too_large = {}, []
+        if too_large:
+            st.warning(f"Skipped {len(too_large)} file(s) over the size limit: {', '.join(too_large)}")
+
+        if sources:
+            batch = RepoBatch(sources)
+            st.session_state["repo_batch"] = batch
+            done_before = batch.counts()[DONE]
+            if done_before:
+                st.info(f"Resuming: {done_before} of {len(sources)} files were already documented.")
+            progress = st.progress(done_before / len(sources), text=f"{done_before}/{len(sources)} files")
+            table = st.empty()
+            show_batch_table(batch, table)
+            for finished, (path, record) in enumerate(batch.run(graph, int(max_concurrency), batch_use_cache), start=done_before + 1):
+                progress.progress(finished / len(sources), text=f"{finished}/{len(sources)} files, last: {path}")
+                show_batch_table(batch, table)
+        elif not too_large:
+            st.warning("No Python files found.")
+
+    batch = st.session_state.get("repo_batch")
+    if batch:
+        counts = batch.counts()
+        st.write(f"✅ {counts[DONE]} documented, ❌ {counts[FAILED]} failed, ⏳ {counts[PENDING]} pending.")
+        if counts[FAILED]:
+            st.caption("Submit the same repository again to retry the failed files.")
+        if counts[DONE]:
+            st.download_button(
+                label="Download all (.zip)",
+                data=batch.archive(),
+                file_name=f"documented_{batch.id}.zip",
+                mime="application/zip"
+            )
@@ -0,0 +1,83 @@
+import time
+from dataclasses import dataclass, field
+
+# The parallel branches of the documentation graph and the state key each one fills.
+BRANCHES = {
+    "comments_agent": "code_with_comment",
+    "readme_agent": "readme_file",
+    "summary_agent": "summary_file"
+}
+
+def strip_fence(text):
+    """
+    Removes the opening code fence of a reply that is still being written, and the closing one once it arrives.
+    """
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    stripped = text.rstrip()
+    if stripped.endswith("```"):
+        text = stripped[:-3]
+    return text
+
+@dataclass
+class BranchProgress:
+    """
+    What one branch has produced so far and when.
+
+    Tokens are kept per model call, because the commenting branch runs several calls at once.
+    """
+    calls: dict = field(default_factory=dict)
+    first_token: float | None = None
+    seconds: float | None = None
+    text: str | None = None  # The branch's final output, once it has finished
+
+    @property
+    def done(self):
+        return self.seconds is not None
+
+    def live_text(self):
+        """
+        Returns the final output if there is one, otherwise everything streamed so far.
+        """
+        if self.text is not None:
+            return self.text
+        return "\n".join(strip_fence(text) for text in self.calls.values())
+
+class LiveRun:
+    """
+    Runs the documentation graph with graph.stream and tracks each branch's output as it arrives.
+
+    Iterating over run() yields the name of a branch every time it receives
+    tokens or finishes; 'branches' holds their progress and 'result' collects
+    every node's state update, so nothing has to be read back from disk.
+    """
+
+    def __init__(self, graph, state):
+        self.graph = graph
+        self.state = state
+        self.branches = {node: BranchProgress() for node in BRANCHES}
+        self.result = {}
+
+    def run(self):
+        start = time.perf_counter()
+        for mode, chunk in self.graph.stream(self.state, stream_mode=["updates", "messages"]):
+            now = time.perf_counter() - start
+            if mode == "messages":
+                message, metadata = chunk
+                node = metadata.get("langgraph_node")
+                if node not in self.branches or not isinstance(message.content, str) or not message.content:
+                    continue
+                branch = self.branches[node]
+                if branch.first_token is None:
+                    branch.first_token = now
+                # Chunks of one model call share an id; the commenting branch interleaves several calls.
+                branch.calls[message.id] = branch.calls.get(message.id, "") + message.content
+                yield node
+            else:
+                for node, update in chunk.items():
+                    self.result.update(update or {})
+                    if node in self.branches:
+                        branch = self.branches[node]
+                        branch.seconds = now
+                        branch.text = update[BRANCHES[node]][-1]["content"]
+                        yield node
@@ -0,0 +1,214 @@
+import ast
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from common.response_cache import make_cache_key
+
+# Consecutive small units are commented together, up to this many lines per request.
+COMMENT_CHUNK_LINES = int(os.getenv("COMMENT_CHUNK_LINES", "200"))
+
+@dataclass
+class CodeUnit:
+    kind: str  # "header", "module", "function" or "class"
+    name: str
+    start: int  # First line, 1-based
+    end: int  # Last line, inclusive
+    text: str
+    statements: int  # Top-level statements in the unit
+
+def _definition_start(node):
+    # Decorators belong to the definition they decorate.
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+def _is_definition(node):
+    return isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+
+def _statement_groups(tree):
+    # Each definition is a group of its own; the statements between definitions are grouped together.
+    groups = []
+    for node in tree.body:
+        if _is_definition(node) or not groups or _is_definition(groups[-1][-1]):
+            groups.append([node])
+        else:
+            groups[-1].append(node)
+    return groups
+
+def split_source(source):
+    """
+    Splits Python source into top-level units that together cover every line exactly once.
+
+    Top-level functions and classes (with their decorators) become one unit each;
+    the statements between them become "module" units, the first of which is
+    the module header (docstring, imports, constants). Comments and blank lines
+    belong to the unit that follows them.
+
+    Raises:
+        SyntaxError: If the source does not parse.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines(keepends=True)
+    groups = _statement_groups(tree)
+    if not groups:
+        return [CodeUnit("header", "header", 1, len(lines), source, 0)] if lines else []
+
+    units = []
+    start = 1
+    for index, group in enumerate(groups):
+        node = group[0]
+        if _is_definition(node):
+            kind, name = ("class" if isinstance(node, ast.ClassDef) else "function"), node.name
+        else:
+            kind = name = "module" if index else "header"
+        end = group[-1].end_lineno if index < len(groups) - 1 else len(lines)
+        units.append(CodeUnit(kind, name, start, end, "".join(lines[start - 1:end]), len(group)))
+        start = end + 1
+    return units
+
+def split_commented(units, commented):
+    """
+    Splits the commented version of consecutive units back into one text per unit.
+
+    Args:
+        units (list[CodeUnit]): The units that were commented together.
+        commented (str): The model's version of their combined text.
+
+    Returns:
+        list[str] | None: The text for each unit, or None if the reply does not have the same top-level statements.
+    """
+    if len(units) == 1:
+        return [commented]
+    try:
+        body = ast.parse(commented).body
+    except SyntaxError:
+        return None
+    if len(body) != sum(unit.statements for unit in units):
+        return None
+
+    lines = commented.splitlines(keepends=True)
+    texts, start, index = [], 0, 0
+    for unit in units[:-1]:
+        index += unit.statements
+        end = body[index - 1].end_lineno
+        texts.append("".join(lines[start:end]))
+        start = end
+    texts.append("".join(lines[start:]))
+    return texts
+
+def unit_hash(unit):
+    """
+    Returns a hash of a unit's exact text, comments and formatting included.
+
+    A cached commented unit replaces the user's source, so it may only be reused
+    for the very text it was generated from; any edit, even to a comment, misses.
+    """
+    return hashlib.sha256(unit.text.encode("utf-8")).hexdigest()
+
+def _signature(node):
+    decorators = "".join(f"@{ast.unparse(d)}\n" for d in node.decorator_list)
+    if isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases + node.keywords)
+        methods = [
+            _signature(n) for n in node.body
+            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and (not n.name.startswith("_") or n.name == "__init__")
+        ]
+        return f"{decorators}class {node.name}({bases}): " + "; ".join(methods)
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{decorators}{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+def public_surface(source):
+    """
+    Describes what a module exposes: its docstring, imports, public names and public signatures.
+
+    Bodies are left out, so edits inside a function do not change the surface.
+    Source that does not parse is returned unchanged.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source
+    items = [ast.get_docstring(tree) or ""]
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            items.append(ast.unparse(node))
+        elif _is_definition(node) and not node.name.startswith("_"):
+            items.append(_signature(node))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            items.extend(t.id for t in targets if isinstance(t, ast.Name) and not t.id.startswith("_"))
+    return "\n".join(items)
+
+def module_identity(source, name=""):
+    """
+    Returns a hash that tells modules with the same public surface apart.
+
+    It covers the module's name (e.g. its file name or repo path) and its
+    top-level statements other than function and class definitions, such as a
+    script's body. Source that does not parse is hashed as it is.
+    """
+    try:
+        tree = ast.parse(source)
+        statements = "\n".join(ast.unparse(node) for node in tree.body if not _is_definition(node))
+    except SyntaxError:
+        statements = source
+    return hashlib.sha256(f"{name}\n{statements}".encode("utf-8")).hexdigest()
+
+def surface_key(model, source, name, prompt_version):
+    """
+    Builds the cache key of a module-level document (README or summary).
+
+    The document is reused while the module's public surface is unchanged, but
+    only for the same module, so unrelated files with the same surface never share it.
+    """
+    return make_cache_key(model, None, public_surface(source), prompt_version, module=module_identity(source, name or ""))
+
+def group_units(units, max_lines=COMMENT_CHUNK_LINES):
+    """
+    Groups consecutive units into chunks of at most 'max_lines' lines (a larger unit is a chunk of its own).
+
+    Units that are not next to each other in the file never share a chunk.
+    """
+    chunks, current, size = [], [], 0
+    for unit in units:
+        lines = unit.end - unit.start + 1
+        if current and (size + lines > max_lines or unit.start != current[-1].end + 1):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(unit)
+        size += lines
+    if current:
+        chunks.append(current)
+    return chunks
+
+def extract_code_block(reply):
+    """
+    Returns the contents of the first fenced code block in a model reply, or the reply itself if there is none.
+    """
+    match = re.search(r"```[\w+-]*[ \t]*\n(.*?)\n?```", reply, re.DOTALL)
+    return match.group(1) if match else reply
+
+def _strip_docstrings(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            body = node.body
+            if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+                    and isinstance(body[0].value.value, str):
+                node.body = body[1:] or [ast.Pass()]
+    return tree
+
+def same_code(original, commented):
+    """
+    Returns True if 'commented' parses and is the same program as 'original' once comments and docstrings are ignored.
+    """
+    try:
+        commented_tree = ast.parse(commented)
+    except SyntaxError:
+        return False
+    return ast.dump(_strip_docstrings(ast.parse(original))) == ast.dump(_strip_docstrings(commented_tree))
+
+def splice(parts):
+    """
+    Joins commented chunks back into one file, keeping each chunk on its own lines.
+    """
+    return "".join(part if part.endswith("\n") else part + "\n" for part in parts)
@@ -4,7 +4,10 @@ from typing_extensions import TypedDict
 from typing import Annotated
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langchain.chat_models import init_chat_model
+from common.clients import get_chat_model
+from common.rate_limiter import BATCH
+from common.llm_callbacks import get_metrics_handler
+from common.response_cache import ResponseCache
 
 from .nodes.comment_node import get_comment_node
 from .nodes.save_py_node import save_py_agent
@@ -14,11 +17,21 @@ from .nodes.summary_node import get_summary_node  # <-- new
 from .nodes.save_summary_node import save_summary_agent  # <-- new
 from .nodes.folder_node import create_folder_node
 
+MODEL = "command-r-plus"
+
+# Commented units, READMEs and summaries are reused for this long after they were generated.
+CODE_CACHE_TTL_DAYS = float(os.getenv("CODE_CACHE_TTL_DAYS", "30"))
+
 class FullState(TypedDict):
     messages: Annotated[list, add_messages]
     code_with_comment: str | None
+    comment_report: dict | None
     readme_file: str | None
+    readme_cached: bool | None
     summary_file: str | None  # <-- new
+    summary_cached: bool | None
+    use_cache: bool | None
+    module_name: str | None
     py_file_path: str | None
     md_file_path: str | None
     summary_file_path: str | None  # <-- new
@@ -28,11 +41,15 @@ class FullState(TypedDict):
 def build_graph():
     load_dotenv()
 
-    llm = init_chat_model(
-        "command-r-plus",
+    llm = get_chat_model(
+        MODEL,
         model_provider="cohere",
+        # Documentation jobs queue behind interactive chat for the shared Cohere budget.
+        priority=BATCH,
         api_key=os.getenv("COHERE_API_KEY")
-    )
+    ).with_config(callbacks=[get_metrics_handler("code_to_comment_readme_summary")])
+    # Shared with the other apps' response cache, so results survive restarts.
+    cache = ResponseCache(ttl_seconds=CODE_CACHE_TTL_DAYS * 24 * 3600)
 
     graph_builder = StateGraph(FullState)
 
@@ -43,13 +60,13 @@ def build_graph():
     graph_builder.add_node("create_folder", create_folder_node)
     graph_builder.add_node("split", splitter_node)
 
-    graph_builder.add_node("comments_agent", get_comment_node(llm))
+    graph_builder.add_node("comments_agent", get_comment_node(llm, cache, MODEL))
     graph_builder.add_node("save_py_agent", save_py_agent)
 
-    graph_builder.add_node("readme_agent", get_readme_node(llm))
+    graph_builder.add_node("readme_agent", get_readme_node(llm, cache, MODEL))
     graph_builder.add_node("save_md_agent", save_readme_agent)
 
-    graph_builder.add_node("summary_agent", get_summary_node(llm))  # <-- new
+    graph_builder.add_node("summary_agent", get_summary_node(llm, cache, MODEL))  # <-- new
     graph_builder.add_node("save_summary_agent", save_summary_agent)  # <-- new
 
     # Edges
@@ -1,43 +1,106 @@
+import os
 from typing_extensions import TypedDict
 from typing import Annotated
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 
+from common.response_cache import make_cache_key
+from ..code_chunks import extract_code_block, group_units, same_code, splice, split_commented, split_source, unit_hash
+
 load_dotenv()
 
+# How many sections of one file are commented at the same time.
+COMMENT_MAX_CONCURRENCY = int(os.getenv("COMMENT_MAX_CONCURRENCY", "4"))
+
+# Bump whenever SYSTEM_PROMPT changes meaning, so cached comments are regenerated.
+COMMENT_PROMPT_VERSION = "comments-v2"
+
+SYSTEM_PROMPT = """
+    You are a skilled coding assistant whose job is to review the provided source code and insert clear, precise comments that explain its purpose, logic, and any non-trivial sections.
+
+    The code you receive is {position} of a larger Python file.
+    When you receive code input from the user:
+    1. {header}
+    2. Inline comment complex logic
+    3. Use # for Python comments
+    4. Maintain clean formatting
+    5. Do not change logic, and do not add, remove or reorder any code
+    6. Return exactly the section you were given with comments added
+    7. Wrap your response in triple backticks
+"""
+
+HEADER_INSTRUCTION = "Add a comment header outlining:\n       - Purpose\n       - Inputs / Outputs"
+DEFINITION_INSTRUCTION = "Add a short comment above each function and class outlining its purpose, inputs and outputs"
+
 class CommentState(TypedDict):
     messages: Annotated[list, add_messages]
     code_with_comment: str | None
+    comment_report: dict | None
+    use_cache: bool | None
+
+def _messages(code, start, end, total_lines):
+    # A section starting at line 1 carries the module header.
+    system = SYSTEM_PROMPT.format(
+        position=f"lines {start}-{end} (of {total_lines})" if start > 1 or end < total_lines else "all",
+        header=HEADER_INSTRUCTION if start == 1 else DEFINITION_INSTRUCTION
+    )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": code}
+    ]
+
+def _chunk_messages(chunk, total_lines):
+    return _messages("".join(unit.text for unit in chunk), chunk[0].start, chunk[-1].end, total_lines)
+
+def get_comment_node(llm, cache=None, model=""):
+    def unit_key(unit):
+        # The header prompt differs from the others, so a unit's position is part of its key.
+        return make_cache_key(model, None, unit_hash(unit), COMMENT_PROMPT_VERSION, header=unit.start == 1)
 
-def get_comment_node(llm):
     def comments_agent(state: CommentState):
-        last_message = state["messages"][-1]
-        messages = [
-            {
-                "role": "system",
-                "content": """
-                    You are a skilled coding assistant whose job is to review the provided source code and insert clear, precise comments that explain its purpose, logic, and any non-trivial sections.
-
-                    When you receive code input from the user:
-                    1. Add a comment header outlining:
-                       - Purpose
-                       - Inputs / Outputs
-                    2. Inline comment complex logic
-                    3. Use # for Python comments
-                    4. Maintain clean formatting
-                    5. Do not change logic
-                    6. Wrap your response in triple backticks
-                """
-            },
-            {
-                "role": "user",
-                "content": last_message.content
-            }
-        ]
-
-        reply = llm.invoke(messages)
-        split_lines = reply.content.split("\n")[1:-1]
-        code = "\n".join(split_lines)
-        return {"code_with_comment": [{"role": "assistant", "content": code}]}
+        code = state["messages"][-1].content
+        total_lines = max(len(code.splitlines()), 1)
+        try:
+            units = split_source(code)
+        except SyntaxError:
+            # Not valid Python, so there are no units to split on: comment it in one request as before.
+            reply = llm.invoke(_messages(code, 1, total_lines, total_lines))
+            report = {"units": 0, "cached": 0, "chunks": 1, "fallbacks": 0, "verified": False}
+            return {"code_with_comment": [{"role": "assistant", "content": extract_code_block(reply.content)}], "comment_report": report}
+
+        use_cache = cache is not None and state.get("use_cache", True)
+        texts = [cache.get(unit_key(unit)) if use_cache else None for unit in units]
+        cached = sum(text is not None for text in texts)
+
+        # Only units whose code changed go back to the model.
+        chunks = group_units([unit for unit, text in zip(units, texts) if text is None])
+        # Each section is an independent request, bounded so one large file does not flood the provider.
+        replies = llm.batch(
+            [_chunk_messages(chunk, total_lines) for chunk in chunks],
+            config={"max_concurrency": COMMENT_MAX_CONCURRENCY},
+            return_exceptions=True
+        )
+
+        commented = {}
+        fallbacks = 0
+        for chunk, reply in zip(chunks, replies):
+            parts = None if isinstance(reply, Exception) else split_commented(chunk, extract_code_block(reply.content))
+            for position, unit in enumerate(chunk):
+                text = parts[position] if parts else None
+                # A unit whose request failed, or whose code the model changed, keeps its original text.
+                if text is None or not same_code(unit.text, text):
+                    commented[unit.start] = unit.text
+                    fallbacks += 1
+                    continue
+                commented[unit.start] = text
+                if cache is not None:
+                    cache.set(unit_key(unit), text)
+
+        commented_code = splice([text if text is not None else commented[unit.start] for unit, text in zip(units, texts)])
+        verified = same_code(code, commented_code)
+        if not verified:
+            commented_code = code
+        report = {"units": len(units), "cached": cached, "chunks": len(chunks), "fallbacks": fallbacks, "verified": verified}
+        return {"code_with_comment": [{"role": "assistant", "content": commented_code}], "comment_report": report}
 
     return comments_agent
@@ -3,15 +3,30 @@ from typing import Annotated
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 
+from ..code_chunks import surface_key
+
 load_dotenv()
 
+# Bump whenever the prompt changes meaning, so cached READMEs are regenerated.
+README_PROMPT_VERSION = "readme-v1"
+
 class ReadmeState(TypedDict):
     messages: Annotated[list, add_messages]
     readme_file: str | None
+    readme_cached: bool | None
+    use_cache: bool | None
+    module_name: str | None
 
-def get_readme_node(llm):
+def get_readme_node(llm, cache=None, model=""):
     def readme_agent(state: ReadmeState):
         last_message = state["messages"][-1]
+        # The readme only changes when what the module exposes changes, not on edits inside function bodies.
+        key = surface_key(model, last_message.content, state.get("module_name"), README_PROMPT_VERSION)
+        if cache is not None and state.get("use_cache", True):
+            cached = cache.get(key)
+            if cached is not None:
+                return {"readme_file": [{"role": "assistant", "content": cached}], "readme_cached": True}
+
         messages = [
             {
                 "role": "system",
@@ -42,6 +57,8 @@ def get_readme_node(llm):
         reply = llm.invoke(messages)
         split_lines = reply.content.split("\n")[1:-1]
         markdown_string = "\n".join(split_lines)
-        return {"readme_file": [{"role": "assistant", "content": markdown_string}]}
+        if cache is not None:
+            cache.set(key, markdown_string)
+        return {"readme_file": [{"role": "assistant", "content": markdown_string}], "readme_cached": False}
 
     return readme_agent
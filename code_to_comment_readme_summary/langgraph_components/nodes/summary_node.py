@@ -3,15 +3,30 @@ from typing import Annotated
 from langgraph.graph.message import add_messages
 from dotenv import load_dotenv
 
+from ..code_chunks import surface_key
+
 load_dotenv()
 
+# Bump whenever the prompt changes meaning, so cached summaries are regenerated.
+SUMMARY_PROMPT_VERSION = "summary-v1"
+
 class SummaryState(TypedDict):
     messages: Annotated[list, add_messages]
     summary_file: str | None
+    summary_cached: bool | None
+    use_cache: bool | None
+    module_name: str | None
 
-def get_summary_node(llm):
+def get_summary_node(llm, cache=None, model=""):
     def summary_agent(state: SummaryState):
         last_message = state["messages"][-1]
+        # The summary only changes when what the module exposes changes, not on edits inside function bodies.
+        key = surface_key(model, last_message.content, state.get("module_name"), SUMMARY_PROMPT_VERSION)
+        if cache is not None and state.get("use_cache", True):
+            cached = cache.get(key)
+            if cached is not None:
+                return {"summary_file": [{"role": "assistant", "content": cached}], "summary_cached": True}
+
         messages = [
             {
                 "role": "system",
@@ -41,6 +56,8 @@ def get_summary_node(llm):
         reply = llm.invoke(messages)
         split_lines = reply.content.split("\n")[1:-1]
         summary_markdown_string = "\n".join(split_lines)
-        return {"summary_file": [{"role": "assistant", "content": summary_markdown_string}]}
+        if cache is not None:
+            cache.set(key, summary_markdown_string)
+        return {"summary_file": [{"role": "assistant", "content": summary_markdown_string}], "summary_cached": False}
 
     return summary_agent
@@ -0,0 +1,167 @@
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+
+# Files documented at the same time; each one already runs its three agents in parallel.
+REPO_BATCH_CONCURRENCY = max(1, int(os.getenv("REPO_BATCH_CONCURRENCY", "3")))
+# Larger files are skipped rather than sent to the model.
+REPO_BATCH_MAX_FILE_BYTES = int(os.getenv("REPO_BATCH_MAX_FILE_BYTES", str(512 * 1024)))
+SKIPPED_DIRECTORIES = {"__pycache__", "__MACOSX", ".git", ".venv", "venv", "node_modules", "site-packages"}
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+def _wanted(path):
+    parts = path.replace("\\", "/").split("/")
+    return path.endswith(".py") and not any(part in SKIPPED_DIRECTORIES or part.startswith(".") for part in parts[:-1])
+
+def read_zip(data):
+    """
+    Returns the Python files in a zip archive.
+
+    Args:
+        data (bytes): The archive.
+
+    Returns:
+        tuple[dict, list]: Source text by path inside the archive, and the paths that were too large.
+    """
+    sources, too_large = {}, []
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not _wanted(info.filename):
+                continue
+            if info.file_size > REPO_BATCH_MAX_FILE_BYTES:
+                too_large.append(info.filename)
+                continue
+            sources[info.filename] = archive.read(info).decode("utf-8", errors="replace")
+    return sources, too_large
+
+def read_directory(directory):
+    """
+    Returns the Python files under a directory, keyed by their path relative to it.
+
+    Returns:
+        tuple[dict, list]: Source text by relative path, and the paths that were too large.
+    """
+    sources, too_large = {}, []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in SKIPPED_DIRECTORIES and not d.startswith("."))
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory).replace(os.sep, "/")
+            if not _wanted(relative):
+                continue
+            if os.path.getsize(path) > REPO_BATCH_MAX_FILE_BYTES:
+                too_large.append(relative)
+                continue
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                sources[relative] = f.read()
+    return sources, too_large
+
+def batch_id(sources):
+    """
+    Returns an id that only depends on the files' paths and contents, so uploading the same repository again resumes it.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(sources):
+        digest.update(path.encode("utf-8") + b"\0" + hashlib.sha256(sources[path].encode("utf-8")).digest())
+    return digest.hexdigest()[:16]
+
+class RepoBatch:
+    """
+    Documents every file of a repository with the compiled graph and remembers the progress on disk.
+
+    A manifest in temp/batch_<id>/ records each file's status and output
+    folder after every completed file, so a batch that was interrupted or had
+    failures can be run again and only redoes the files that are not done.
+    """
+
+    def __init__(self, sources, root="temp"):
+        self.sources = sources
+        self.id = batch_id(sources)
+        self.directory = os.path.join(root, f"batch_{self.id}")
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        os.makedirs(self.directory, exist_ok=True)
+        self.files = {path: {"status": PENDING} for path in sorted(sources)}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                saved = json.load(f)["files"]
+            # Finished files only count if their outputs are still on disk.
+            for path, record in saved.items():
+                if path in self.files and (record["status"] != DONE or os.path.isdir(record["folder_path"])):
+                    self.files[path] = record
+
+    def _save(self):
+        # Written to a temporary file first, so an interrupted write never corrupts the manifest.
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"id": self.id, "files": self.files}, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def pending(self):
+        """
+        Returns the paths that still need to run (not started or failed).
+        """
+        return [path for path, record in self.files.items() if record["status"] != DONE]
+
+    def counts(self):
+        """
+        Returns how many files are done, failed and pending.
+        """
+        statuses = [record["status"] for record in self.files.values()]
+        return {status: statuses.count(status) for status in (DONE, FAILED, PENDING)}
+
+    def run(self, graph, max_concurrency=REPO_BATCH_CONCURRENCY, use_cache=True):
+        """
+        Runs the pending files through the graph and yields (path, record) as each one finishes.
+
+        Args:
+            graph: The compiled documentation graph.
+            max_concurrency (int): Files in flight at once. Model calls also wait on the shared rate limiter.
+            use_cache (bool): Whether unchanged units and documents may come from the cache.
+        """
+        paths = self.pending()
+        inputs = [
+            {"messages": [{"role": "user", "content": self.sources[path]}], "use_cache": use_cache, "module_name": path}
+            for path in paths
+        ]
+        start = time.perf_counter()
+        # batch_as_completed is graph.batch that hands back each result as soon as it is ready.
+        for index, result in graph.batch_as_completed(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True):
+            if isinstance(result, Exception):
+                record = {"status": FAILED, "error": f"{type(result).__name__}: {result}"}
+            else:
+                record = {"status": DONE, "folder_path": result["folder_path"]}
+            record["finished_after"] = round(time.perf_counter() - start, 1)
+            self.files[paths[index]] = record
+            self._save()
+            yield paths[index], record
+
+    def archive(self):
+        """
+        Returns a zip of every finished file's commented code, README and summary, plus the manifest.
+
+        Each file keeps its path; its README and summary sit next to it as <name>.README.md and <name>.summary.md.
+        """
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path, record in self.files.items():
+                if record["status"] != DONE:
+                    continue
+                folder_path = record["folder_path"]
+                base = path[:-len(".py")]
+                outputs = {
+                    path: f"{os.path.basename(folder_path)}.py",
+                    f"{base}.README.md": "README.md",
+                    f"{base}.summary.md": "summary.md"
+                }
+                for name, output in outputs.items():
+                    output_path = os.path.join(folder_path, output)
+                    if os.path.exists(output_path):
+                        archive.write(output_path, name)
+            archive.writestr("manifest.json", json.dumps({"id": self.id, "files": self.files}, indent=2))
+        return buffer.getvalue()
@@ -1,20 +1,32 @@
 import streamlit as st
 import os
+import sys
+import time
 from langgraph.graph import StateGraph, START, END
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
 from langgraph.graph.message import add_messages
 from typing_extensions import TypedDict
 from typing import Annotated
 
+# Make the repository's shared 'common' package importable when run from this folder
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.clients import get_chat_model
+from common.llm_callbacks import get_metrics_handler
+from common.docs_cache import DocsCache, describe_stats, make_docs_key
+
 # Load environment variables
 load_dotenv()
 
-# Initialize LLM
-llm = init_chat_model(
-    "gemini-2.5-flash",
+MODEL = "gemini-2.5-flash"
+# Bump whenever the prompt below changes meaning, so cached documentation is regenerated.
+PROMPT_VERSION = "all-in-one-v1"
+
+# Get the shared Gemini client; it survives Streamlit reruns instead of being rebuilt on each one.
+# Its calls are recorded in the shared metrics under this app's name.
+llm = get_chat_model(
+    MODEL,
     model_provider="google-genai"
-)
+).with_config(callbacks=[get_metrics_handler("code_to_comment_readme_summary_2")])
 
 # Define state
 class State(TypedDict):
@@ -97,6 +109,13 @@ graph_builder.add_edge("generate_all_agent", END)
 graph = graph_builder.compile()
 
 # Streamlit UI
+@st.cache_resource
+def get_docs_cache():
+    # Shared with the other documentation app, so identical files are answered across sessions and restarts.
+    return DocsCache()
+
+docs_cache = get_docs_cache()
+
 st.title("📄 Python Code Documentation Assistant")
 
 uploaded_file = st.file_uploader("Upload a Python (.py) file", type=["py"])
@@ -106,33 +125,45 @@ if uploaded_file:
     with st.expander("🧾 Oriiginal Code", expanded=False):
         st.code(code_text, language="python")
 
-    # Only invoke the LLM if it's a new upload or not cached
-    if "doc_result" not in st.session_state or st.session_state.get("last_code") != code_text:
-        with st.spinner("Generating documentation..."):
-            state = {"messages": [{"role": "user", "content": code_text}]}
-            result = graph.invoke(state)
-            st.session_state.doc_result = result
-            st.session_state.last_code = code_text
+    # Only invoke the LLM for a file that has not been documented before.
+    # The result is kept for the session, so reruns (e.g. expander toggles) do not look it up again.
+    docs_key = make_docs_key(code_text, MODEL, {"all": PROMPT_VERSION})
+    if st.session_state.get("docs_key") != docs_key:
+        docs = docs_cache.get_docs(docs_key)
+        served_from_cache = docs is not None
+        if docs is None:
+            with st.spinner("Generating documentation..."):
+                start = time.perf_counter()
+                state = {"messages": [{"role": "user", "content": code_text}]}
+                result = graph.invoke(state)
+                docs = {key: result[key][-1]["content"] for key in ("code", "readme", "summary")}
+                docs_cache.set_docs(docs_key, docs, time.perf_counter() - start)
+        st.session_state["docs_key"] = docs_key
+        st.session_state["docs"] = docs
+        st.session_state["docs_served_from_cache"] = served_from_cache
+    docs = st.session_state["docs"]
+
+    if st.session_state["docs_served_from_cache"]:
+        st.success("Served from the documentation cache: this exact file was documented before.")
     else:
-        result = st.session_state.doc_result
-
-    st.success("Documentation generated!")
+        st.success("Documentation generated!")
+    st.caption(describe_stats(docs_cache.stats()))
 
     with st.expander("🧠 Code with Comments", expanded=False):
-        st.code(result['code'][-1]["content"], language='python')
+        st.code(docs["code"], language='python')
 
     with st.expander("📘 README.md", expanded=False):
-        st.markdown(result['readme'][-1]["content"])
+        st.markdown(docs["readme"])
 
     with st.expander("📝 Summary", expanded=False):
-        st.markdown(result['summary'][-1]["content"])
+        st.markdown(docs["summary"])
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
         st.download_button(
             label="⬇️ Commented Code",
-            data=result['code'][-1]["content"],
+            data=docs["code"],
             file_name="commented_code.py",
             mime="text/x-python"
         )
@@ -140,7 +171,7 @@ if uploaded_file:
     with col2:
         st.download_button(
             label="⬇️ README.md",
-            data=result['readme'][-1]["content"],
+            data=docs["readme"],
             file_name="README.md",
             mime="text/markdown"
         )
@@ -148,7 +179,7 @@ if uploaded_file:
     with col3:
         st.download_button(
             label="⬇️ Summary",
-            data=result['summary'][-1]["content"],
+            data=docs["summary"],
             file_name="summary.md",
             mime="text/markdown"
         )
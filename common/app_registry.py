@@ -0,0 +1,96 @@
+import importlib # For importing an app module only when it is first opened.
+import os # For reading the prewarm switch.
+import threading # For prewarming app modules in the background.
+import time # For timing app imports.
+from dataclasses import dataclass # For the app descriptions.
+
+# Import the other apps in a background thread after the dashboard has rendered, so the
+# first navigation to them does not pay for their langchain/PIL imports.
+APP_PREWARM = os.getenv("APP_PREWARM", "1") == "1"
+
+@dataclass(frozen=True)
+class AppSpec:
+    """
+    One app of the multi-app dashboard: its sidebar label, module and home page blurb.
+
+    The module is only named here, not imported, so listing the apps costs nothing.
+    """
+    label: str
+    module: str
+    heading: str
+    description: str
+
+APPS = (
+    AppSpec(
+        label="Basic Text Generator",
+        module="basic_text_generator.basic_text_generator",
+        heading="😄 Basic Text Generator",
+        description="""
+        A fun and interactive app that uses Cohere's AI to generate creative jokes based on any topic you provide.
+        Powered by LangChain and Streamlit, it delivers real-time humor with just one click.
+        """
+    ),
+    AppSpec(
+        label="AI Story Generator",
+        module="ai_story_generator.ai_story_generator",
+        heading="📖 AI Story Generator",
+        description="""
+        Generate creative and engaging stories from any opening sentence using Cohere's command-r-plus model with real-time streaming and adjustable creativity.
+        """
+    ),
+    AppSpec(
+        label="Text to Image Generator",
+        module="text_to_image_generator.text_to_image_generator",
+        heading="🎨 Free Text → Image Generator",
+        description="""
+        Turn your imagination into visuals using the ClipDrop Text-to-Image API.
+        This interactive app lets you generate AI-powered images from any text prompt,
+        offering a seamless and creative experience powered by Streamlit, Pillow, and secure API integration.
+        """
+    ),
+    AppSpec(
+        label="Knowledge Based Chatbot",
+        module="knowledge_based_chatbot.knowledge_based_chatbot",
+        heading="📄 PDF Knowledge Base (RAG-powered)",
+        description="""
+        Ask questions directly from your PDFs using a Retrieval Augmented Generation (RAG) pipeline.
+        This smart app processes any uploaded PDF and gives fact-based answers grounded strictly in the document’s content,
+        powered by Cohere embeddings, vector search, and real-time streaming with LangChain and Streamlit.
+        """
+    ),
+)
+
+# Seconds each app module took to import in this process, for the startup report.
+import_seconds = {}
+
+def find_app(label):
+    """
+    Returns the AppSpec with a sidebar label, or None.
+    """
+    return next((app for app in APPS if app.label == label), None)
+
+def load_app(app):
+    """
+    Imports an app's module (once per process) and returns it.
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(app.module)
+    import_seconds.setdefault(app.module, time.perf_counter() - start)
+    return module
+
+def prewarm(apps=APPS):
+    """
+    Imports the given apps on a background thread and returns the thread.
+
+    Python's per-module import locks make this safe: if the user opens an app
+    while it is still being prewarmed, the import simply waits for it to finish.
+    """
+    def warm():
+        for app in apps:
+            try:
+                load_app(app)
+            except Exception: # A missing optional dependency only matters once the app is opened.
+                pass
+    thread = threading.Thread(target=warm, name="app-prewarm", daemon=True)
+    thread.start()
+    return thread
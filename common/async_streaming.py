@@ -0,0 +1,89 @@
+import asyncio # For running LangChain's astream() on a private event loop.
+import queue # For handing items from the event loop thread to the consumer.
+import threading # For the event loop thread.
+
+_ITEM, _DONE, _ERROR = range(3)
+
+class AsyncIteratorStream:
+    """
+    A synchronous, cancellable iterator over an async iterator such as chain.astream().
+
+    The async iterator runs as a task on its own event loop thread. Calling
+    cancel() (or close()) cancels that task, which interrupts the pending network
+    read right away and closes the upstream response, instead of waiting for the
+    next chunk to arrive as closing a synchronous stream would.
+    """
+
+    def __init__(self, make_async_iterator):
+        """
+        Args:
+            make_async_iterator (callable): Returns the async iterator to consume, e.g.
+                lambda: chain.astream(inputs). It is called on the event loop thread.
+        """
+        self._items = queue.Queue()
+        self._loop = asyncio.new_event_loop()
+        self._task = None
+        self._started = threading.Event()
+        self._finished = False
+        self.cancelled = False
+        self._thread = threading.Thread(target=self._run, args=(make_async_iterator,), name="async-stream", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    async def _consume(self, make_async_iterator):
+        iterator = make_async_iterator()
+        try:
+            async for item in iterator:
+                self._items.put((_ITEM, item))
+            self._items.put((_DONE, None))
+        except asyncio.CancelledError:
+            self._items.put((_DONE, None))
+            raise
+        except Exception as e:
+            self._items.put((_ERROR, e))
+        finally:
+            # Close the async generator explicitly so the HTTP response is released now.
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def _run(self, make_async_iterator):
+        asyncio.set_event_loop(self._loop)
+        self._task = self._loop.create_task(self._consume(make_async_iterator))
+        self._started.set()
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+        kind, value = self._items.get()
+        if kind == _ITEM:
+            return value
+        self._finished = True
+        if kind == _ERROR:
+            raise value
+        raise StopIteration
+
+    def cancel(self):
+        """
+        Cancels the upstream async iterator. Safe to call from any thread, and more than once.
+        """
+        if self.cancelled or not self._thread.is_alive():
+            return
+        self.cancelled = True
+        try:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        except RuntimeError: # The loop finished and closed in the meantime.
+            pass
+
+    def close(self):
+        self.cancel()
@@ -0,0 +1,159 @@
+import os # For reading API keys from the environment.
+import threading # For sharing the registry between Streamlit sessions.
+from common.rate_limiter import INTERACTIVE, get_langchain_rate_limiter, get_shared_limiter, get_token_reconciler, rate_limited_embeddings
+
+# Keep-alive connection pool sizing for plain HTTP clients (ClipDrop).
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+# Overridable so the image apps can be pointed at a local fake server.
+CLIPDROP_URL = os.getenv("CLIPDROP_URL", "https://clipdrop-api.co")
+
+def _freeze(value):
+    # Turns keyword arguments into a hashable registry key.
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+class ClientRegistry:
+    """
+    A process-wide registry of long-lived model and HTTP clients, keyed by their configuration.
+
+    Every app asks the registry for a client instead of constructing its own, so
+    the underlying HTTP connection pools (and their TLS sessions) are created once
+    per configuration and reused by every Streamlit session and rerun.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._overrides = {}
+        self.created = {}
+        self.reused = {}
+
+    def get(self, kind, factory, **config):
+        """
+        Returns the client of 'kind' for 'config', building it with factory(**config) on first use.
+        """
+        key = (kind, _freeze(config))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.reused[kind] = self.reused.get(kind, 0) + 1
+                return client
+            factory = self._overrides.get(kind, factory)
+            # Built under the lock so concurrent sessions never construct the same client twice.
+            client = self._clients[key] = factory(**config)
+            self.created[kind] = self.created.get(kind, 0) + 1
+            return client
+
+    def override(self, kind, factory):
+        """
+        Builds every client of 'kind' with 'factory' from now on, e.g. offline fakes in benchmarks.
+
+        Clients of that kind that were already built are dropped.
+        """
+        with self._lock:
+            self._overrides[kind] = factory
+            for key in [key for key in self._clients if key[0] == kind]:
+                del self._clients[key]
+
+    def clients(self):
+        with self._lock:
+            return list(self._clients.items())
+
+    def stats(self):
+        """
+        Returns per-kind construction/reuse counters and connection pool statistics for HTTP sessions.
+        """
+        stats = {"created": dict(self.created), "reused": dict(self.reused), "http_pools": []}
+        for (kind, _), client in self.clients():
+            adapters = getattr(client, "adapters", None)
+            if not adapters:
+                continue
+            for prefix, adapter in adapters.items():
+                for pool_key in adapter.poolmanager.pools.keys():
+                    pool = adapter.poolmanager.pools[pool_key]
+                    stats["http_pools"].append({
+                        "client": kind,
+                        "prefix": prefix,
+                        "host": pool.host,
+                        "connections_opened": pool.num_connections,
+                        "requests": pool.num_requests,
+                        "idle": pool.pool.qsize() if pool.pool is not None else 0
+                    })
+        return stats
+
+registry = ClientRegistry()
+
+def get_cohere_chat(model="command-r-plus", temperature=0.5, priority=INTERACTIVE, **kwargs):
+    """
+    Returns a shared ChatCohere client for a model configuration.
+
+    Every request first takes capacity from the shared Cohere rate limiter with the
+    given priority class (see common.rate_limiter), and its real token usage is
+    settled with the limiter when it ends.
+    """
+    def build(priority, **config):
+        from langchain_cohere import ChatCohere # Imported lazily so apps that never use Cohere do not pay for it.
+        reconciler = get_token_reconciler("cohere")
+        if reconciler is not None:
+            config["callbacks"] = [reconciler]
+        return ChatCohere(rate_limiter=get_langchain_rate_limiter("cohere", priority), **config)
+    return registry.get("cohere_chat", build, model=model, temperature=temperature, priority=priority, **kwargs)
+
+def get_cohere_embeddings(model="embed-english-light-v3.0", priority=INTERACTIVE, **kwargs):
+    """
+    Returns a shared CohereEmbeddings client for a model configuration.
+
+    Embeddings have their own rate limit budget, "cohere-embed" (see get_shared_limiter()),
+    separate from chat. Queries use the given priority class; document batches use BATCH.
+    """
+    def build(priority, **config):
+        from langchain_cohere import CohereEmbeddings
+        embeddings = CohereEmbeddings(**config)
+        limiter = get_shared_limiter("cohere-embed")
+        return rate_limited_embeddings(embeddings, limiter, priority) if limiter is not None else embeddings
+    return registry.get("cohere_embeddings", build, model=model, priority=priority, **kwargs)
+
+def get_chat_model(model, model_provider, priority=INTERACTIVE, **kwargs):
+    """
+    Returns a shared chat model built with LangChain's init_chat_model(), e.g. Gemini or Cohere.
+
+    Providers with a shared rate limiter configured (see get_shared_limiter()) are limited with the given priority class.
+    """
+    def build(model, model_provider, priority, **config):
+        from langchain.chat_models import init_chat_model
+        rate_limiter = get_langchain_rate_limiter(model_provider, priority)
+        if rate_limiter is not None:
+            config["rate_limiter"] = rate_limiter
+            config["callbacks"] = [get_token_reconciler(model_provider)]
+        return init_chat_model(model, model_provider=model_provider, **config)
+    return registry.get(f"{model_provider}_chat", build, model=model, model_provider=model_provider, priority=priority, **kwargs)
+
+def get_clipdrop_session(api_key=None):
+    """
+    Returns a shared keep-alive requests.Session for the ClipDrop API.
+
+    The session's connection pool keeps TLS connections to ClipDrop open between
+    requests, and the API key header is set once on the session.
+    """
+    def build(api_key):
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        # Retries are handled by the caller, which knows how to honour Retry-After.
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["x-api-key"] = api_key or ""
+        return session
+    return registry.get("clipdrop_http", build, api_key=api_key or os.getenv("CLIPDROP_KEY"))
+
+def pool_stats():
+    """
+    Returns the registry statistics, see ClientRegistry.stats().
+    """
+    return registry.stats()
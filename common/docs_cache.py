@@ -0,0 +1,77 @@
+import hashlib # For hashing source files.
+import json # For storing the three documents as one value.
+import os # For the cache location and limits.
+from common.response_cache import ResponseCache, make_cache_key # For the two-tier SQLite cache underneath.
+
+# Finished documentation for whole files, shared by both code documentation apps.
+DOCS_CACHE_PATH = os.getenv("DOCS_CACHE_PATH", os.path.join("data", "docs_cache.sqlite3"))
+DOCS_CACHE_MAX_MB = float(os.getenv("DOCS_CACHE_MAX_MB", "100"))
+DOCS_CACHE_TTL_DAYS = float(os.getenv("DOCS_CACHE_TTL_DAYS", "30"))
+
+def make_docs_key(source, model, prompt_versions):
+    """
+    Builds the cache key of a file's documentation.
+
+    Args:
+        source (str): The uploaded source code, byte for byte.
+        model (str): The model that writes the documentation.
+        prompt_versions (dict): The version of every prompt involved, by name.
+
+    Returns:
+        str: A hex-encoded SHA-256 digest.
+    """
+    source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    return make_cache_key(model, None, source_hash, json.dumps(prompt_versions, sort_keys=True))
+
+class DocsCache(ResponseCache):
+    """
+    A persistent cache of commented code, README and summary per source file.
+
+    Identical uploads are answered from here across sessions and restarts. The
+    on-disk tier is bounded by the total size of the stored documents and
+    evicts the least recently used files first.
+    """
+
+    def __init__(self, path=DOCS_CACHE_PATH, max_mb=DOCS_CACHE_MAX_MB, ttl_days=DOCS_CACHE_TTL_DAYS):
+        super().__init__(
+            path, max_memory_entries=64, max_disk_entries=100000,
+            ttl_seconds=ttl_days * 24 * 3600, max_disk_bytes=int(max_mb * 1024 * 1024)
+        )
+
+    def get_docs(self, key):
+        """
+        Returns the cached documents as {"code", "readme", "summary"}, or None.
+        """
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_docs(self, key, docs, latency=0.0):
+        """
+        Stores a file's documents, see get_docs().
+
+        Args:
+            key (str): The key from make_docs_key().
+            docs (dict): The commented code, README and summary.
+            latency (float): How long generating them took, in seconds.
+        """
+        self.set(key, json.dumps(docs), latency)
+
+    def stats(self):
+        """
+        Returns the hit/miss counters together with the number and size of the files on disk.
+        """
+        stats = super().stats()
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(length(CAST(value AS BLOB))), 0) FROM responses").fetchone()
+        stats.update({"disk_entries": entries, "disk_bytes": size})
+        return stats
+
+def describe_stats(stats):
+    """
+    Returns a one-line description of DocsCache.stats() for the apps.
+    """
+    return (
+        f"Documentation cache: {stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_ratio']:.0%}), {stats['saved_seconds']:.0f}s saved, "
+        f"{stats['disk_entries']} files ({stats['disk_bytes'] / (1024 * 1024):.1f} MB) stored"
+    )
@@ -0,0 +1,100 @@
+import threading # For handlers shared by several sessions.
+import time # For timing runs.
+from langchain_core.callbacks import BaseCallbackHandler # For hooking into every LLM and retriever run.
+from common.metrics import metrics
+
+def _model_name(serialized, kwargs):
+    params = kwargs.get("invocation_params") or {}
+    model = params.get("model") or params.get("model_name")
+    if not model and serialized:
+        model = (serialized.get("kwargs") or {}).get("model") or (serialized.get("id") or ["unknown"])[-1]
+    return model or "unknown"
+
+def _token_usage(response):
+    # Chat models report usage on the message; older LLMs in llm_output.
+    for generations in response.generations or []:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", usage.get("input_tokens", 0)), usage.get("completion_tokens", usage.get("output_tokens", 0))
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Records latency, time to first token, token counts, retries and errors of every
+    LLM and retriever run it is attached to, under the app it was created for.
+
+    Attach it once where a chain or model is built, e.g.
+    (prompt | llm).with_config(callbacks=[get_metrics_handler("my_app")]).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._runs = {}
+
+    def _start(self, run_id, model, operation):
+        with self._lock:
+            self._runs[run_id] = {"model": model, "operation": operation, "start": time.perf_counter(), "first_token": None, "tokens": 0}
+
+    def _finish(self, run_id, error=False, tokens_in=0, tokens_out=0):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        end = time.perf_counter()
+        ttft = run["first_token"] - run["start"] if run["first_token"] is not None else None
+        metrics.record(
+            self.app, run["model"], run["operation"], end - run["start"], ttft=ttft,
+            tokens_in=tokens_in, tokens_out=tokens_out or run["tokens"], error=error
+        )
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, _model_name(serialized, kwargs), "llm")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, _model_name(serialized, kwargs), "llm")
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None:
+                if run["first_token"] is None:
+                    run["first_token"] = time.perf_counter()
+                run["tokens"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        tokens_in, tokens_out = _token_usage(response)
+        self._finish(run_id, tokens_in=tokens_in, tokens_out=tokens_out)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, (serialized or {}).get("name") or "retriever", "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+    def on_retry(self, retry_state, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is not None:
+            metrics.record_retry(self.app, run["model"], run["operation"])
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+def get_metrics_handler(app):
+    """
+    Returns the shared MetricsCallbackHandler for an app.
+    """
+    with _handlers_lock:
+        handler = _handlers.get(app)
+        if handler is None:
+            handler = _handlers[app] = MetricsCallbackHandler(app)
+        return handler
@@ -0,0 +1,211 @@
+import math # For nearest-rank percentiles.
+import os # For the metrics file and port settings.
+import threading # For recording from any session or worker thread.
+import time # For timing calls.
+from collections import deque # For the rolling window of recent latencies.
+from contextlib import contextmanager # For the timed() helper.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer # For the Prometheus endpoint.
+
+# Latencies kept per series for percentiles; counters and sums cover the whole process lifetime.
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "1000"))
+METRICS_FILE = os.getenv("METRICS_FILE", os.path.join("data", "metrics.prom"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) # 0 disables the HTTP endpoint.
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def percentile(values, q):
+    """
+    Returns the nearest-rank q-quantile of 'values' (0 < q <= 1), or None when there are none.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+class _Series:
+    """
+    Everything recorded for one (app, model, operation) combination.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.latency_sum = 0.0
+        self.generation_seconds = 0.0 # Time spent producing output tokens, for tokens/sec.
+        self.latencies = deque(maxlen=METRICS_WINDOW)
+        self.ttfts = deque(maxlen=METRICS_WINDOW)
+
+class MetricsRegistry:
+    """
+    Process-wide latency, token and error metrics for every model and API call the apps make.
+
+    LLM calls are recorded by the LangChain callback handler in common.llm_callbacks;
+    other calls (vector search, ClipDrop requests) use timed(). The registry can be
+    rendered in Prometheus' text format or summarised with p50/p95/p99 for the UI.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _get(self, app, model, operation):
+        key = (app, model or "unknown", operation)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        return series
+
+    def record(self, app, model, operation, latency, ttft=None, tokens_in=0, tokens_out=0, error=False):
+        """
+        Records one finished call.
+
+        Args:
+            app (str): The app that made the call.
+            model (str): The model or API the call went to.
+            operation (str): What kind of call it was, e.g. "llm", "retrieve" or "http".
+            latency (float): Seconds from start to finish.
+            ttft (float, optional): Seconds until the first streamed token.
+            tokens_in (int): Prompt tokens.
+            tokens_out (int): Generated tokens.
+            error (bool): Whether the call failed.
+        """
+        with self._lock:
+            series = self._get(app, model, operation)
+            series.calls += 1
+            series.errors += int(error)
+            series.tokens_in += tokens_in or 0
+            series.tokens_out += tokens_out or 0
+            series.latency_sum += latency
+            series.latencies.append(latency)
+            if ttft is not None:
+                series.ttfts.append(ttft)
+            if tokens_out:
+                series.generation_seconds += latency - (ttft or 0.0)
+
+    def record_retry(self, app, model, operation):
+        with self._lock:
+            self._get(app, model, operation).retries += 1
+
+    @contextmanager
+    def timed(self, app, model, operation):
+        """
+        Times the body of a with-block as one call; an exception counts as an error and is re-raised.
+
+        The yielded dict may be given 'tokens_in'/'tokens_out' values to record with the call.
+        """
+        extra = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        except BaseException:
+            self.record(app, model, operation, time.perf_counter() - start, error=True, **extra)
+            raise
+        self.record(app, model, operation, time.perf_counter() - start, **extra)
+
+    def summary(self):
+        """
+        Returns one dict per series with counters, p50/p95/p99 latency, time to first token and tokens/sec.
+        """
+        with self._lock:
+            items = [(key, series, list(series.latencies), list(series.ttfts)) for key, series in self._series.items()]
+        rows = []
+        for (app, model, operation), series, latencies, ttfts in sorted(items, key=lambda item: item[0]):
+            row = {"app": app, "model": model, "operation": operation, "calls": series.calls,
+                   "errors": series.errors, "retries": series.retries,
+                   "tokens_in": series.tokens_in, "tokens_out": series.tokens_out}
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}_s"] = percentile(latencies, q)
+            row["ttft_p50_s"] = percentile(ttfts, 0.5)
+            row["ttft_p95_s"] = percentile(ttfts, 0.95)
+            row["tokens_per_s"] = series.tokens_out / series.generation_seconds if series.generation_seconds > 0 else None
+            rows.append(row)
+        return rows
+
+    def to_prometheus(self):
+        """
+        Renders all series in the Prometheus text exposition format.
+        """
+        with self._lock:
+            items = [(key, series, list(series.latencies), list(series.ttfts)) for key, series in self._series.items()]
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        def labels(key, **extra):
+            app, model, operation = key
+            pairs = {"app": app, "model": model, "operation": operation, **extra}
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for v in pairs.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(pairs, escaped)) + "}"
+
+        metric("genai_calls_total", "counter", "Calls made.", [f"genai_calls_total{labels(k)} {s.calls}" for k, s, _, _ in items])
+        metric("genai_errors_total", "counter", "Calls that failed.", [f"genai_errors_total{labels(k)} {s.errors}" for k, s, _, _ in items])
+        metric("genai_retries_total", "counter", "Retried calls.", [f"genai_retries_total{labels(k)} {s.retries}" for k, s, _, _ in items])
+        metric("genai_tokens_total", "counter", "Tokens sent and generated.", [
+            sample for k, s, _, _ in items for sample in (
+                f"genai_tokens_total{labels(k, direction='in')} {s.tokens_in}",
+                f"genai_tokens_total{labels(k, direction='out')} {s.tokens_out}"
+            )
+        ])
+        for name, help_text, index in (("genai_latency_seconds", "Call latency.", 2), ("genai_ttft_seconds", "Time to first token.", 3)):
+            samples = []
+            for item in items:
+                key, series, values = item[0], item[1], item[index]
+                if not values:
+                    continue
+                for q in QUANTILES:
+                    samples.append(f"{name}{labels(key, quantile=q)} {percentile(values, q)}")
+                total = series.latency_sum if index == 2 else sum(values)
+                samples.append(f"{name}_sum{labels(key)} {total}")
+                samples.append(f"{name}_count{labels(key)} {series.calls if index == 2 else len(values)}")
+            metric(name, "summary", help_text, samples)
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=METRICS_FILE):
+        """
+        Writes the Prometheus text format to 'path' (e.g. for node_exporter's textfile collector).
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+    def serve_prometheus(self, port=METRICS_PORT, host="0.0.0.0"):
+        """
+        Serves GET /metrics on a background thread and returns the server.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return server
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+# Process-wide instance shared by every app.
+metrics = MetricsRegistry()
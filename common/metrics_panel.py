@@ -0,0 +1,31 @@
+import streamlit as st # For the debug panel.
+from common.metrics import METRICS_FILE, metrics
+
+def show_metrics_panel():
+    """
+    Shows per-app, per-model call metrics with p50/p95/p99 latencies and a Prometheus export.
+    """
+    rows = metrics.summary()
+    if not rows:
+        st.caption("No model or API calls recorded yet.")
+        return
+
+    def ms(value):
+        return round(value * 1000) if value is not None else None
+
+    st.dataframe([
+        {
+            "app": row["app"], "model": row["model"], "operation": row["operation"],
+            "calls": row["calls"], "errors": row["errors"], "retries": row["retries"],
+            "p50 ms": ms(row["p50_s"]), "p95 ms": ms(row["p95_s"]), "p99 ms": ms(row["p99_s"]),
+            "TTFT p50 ms": ms(row["ttft_p50_s"]), "TTFT p95 ms": ms(row["ttft_p95_s"]),
+            "tokens in": row["tokens_in"], "tokens out": row["tokens_out"],
+            "tokens/s": round(row["tokens_per_s"], 1) if row["tokens_per_s"] is not None else None
+        }
+        for row in rows
+    ], use_container_width=True, hide_index=True)
+
+    download_col, write_col = st.columns(2)
+    download_col.download_button("⬇️ Prometheus metrics", data=metrics.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+    if write_col.button("💾 Write metrics file"):
+        st.caption(f"Wrote {metrics.write_prometheus(METRICS_FILE)}")
@@ -0,0 +1,385 @@
+import asyncio # For waiting without blocking the event loop.
+import os # For the limiter database location and limits.
+import sqlite3 # For sharing bucket state between processes.
+import threading # For the per-process limiter registry.
+import time # For refilling the bucket.
+import uuid # For identifying queued waiters.
+
+# Default location of the shared limiter state; every process using the same file shares the limits.
+DEFAULT_LIMITER_PATH = os.getenv("RATE_LIMITER_PATH", os.path.join("data", "rate_limiter.sqlite3"))
+
+# Priority classes: lower values are served first.
+INTERACTIVE = 0 # A user is waiting on the answer (chat, jokes, stories, RAG).
+BATCH = 10 # Background work such as code documentation jobs.
+
+# How long a request may queue for capacity before giving up, per priority class.
+PRIORITY_DEADLINES = {
+    INTERACTIVE: float(os.getenv("RATE_LIMIT_INTERACTIVE_DEADLINE", "30")),
+    BATCH: float(os.getenv("RATE_LIMIT_BATCH_DEADLINE", "600"))
+}
+
+# Provider limits used when no <PROVIDER>_REQUESTS_PER_MINUTE / <PROVIDER>_TOKENS_PER_MINUTE is set.
+# Empty, so limiting is opt-in: a provider without configured limits is not throttled at all.
+DEFAULT_LIMITS = {}
+
+# Tokens charged for a chat request up front, since the prompt is not visible to the limiter.
+# The difference to the real usage is settled once the response arrives (see get_token_reconciler()).
+TOKENS_PER_CHAT_REQUEST = int(os.getenv("RATE_LIMIT_TOKENS_PER_CHAT_REQUEST", "1500"))
+
+class RateLimitTimeout(TimeoutError):
+    """
+    Raised when a request could not get rate limit capacity before its deadline.
+    """
+
+class SharedRateLimiter:
+    """
+    A requests/min and tokens/min limiter shared by every thread and process using the same SQLite file.
+
+    Both limits are token buckets whose state lives in SQLite, updated in
+    BEGIN IMMEDIATE transactions, so several Streamlit worker processes on one
+    machine draw from the same budget. Callers queue with a priority class and a
+    deadline: capacity always goes to the highest-priority, longest-waiting
+    caller first, and a caller that cannot be served before its deadline gets
+    RateLimitTimeout instead of an opaque 429 from the provider.
+    """
+
+    # Waiters that stop polling (e.g. a killed process) are dropped after this many seconds.
+    STALE_WAITER_SECONDS = 10.0
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute=None, path=DEFAULT_LIMITER_PATH, poll_interval=0.05, max_sleep=1.0):
+        """
+        Args:
+            name (str): The budget to share, e.g. the provider behind one API key.
+            requests_per_minute (float): Request budget per minute; also the largest burst.
+            tokens_per_minute (float, optional): Token budget per minute; None disables the token bucket.
+            path (str): The SQLite file holding the shared state.
+            poll_interval (float): How often a queued caller re-checks while others are ahead of it.
+            max_sleep (float): The longest single sleep, so deadlines and priorities are re-checked regularly.
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_sleep = max_sleep
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.timeouts = 0
+        self.waited_seconds = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "name TEXT NOT NULL, kind TEXT NOT NULL, level REAL NOT NULL, updated REAL NOT NULL, "
+                "PRIMARY KEY (name, kind))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS waiters ("
+                "id TEXT PRIMARY KEY, name TEXT NOT NULL, priority INTEGER NOT NULL, "
+                "enqueued REAL NOT NULL, deadline REAL NOT NULL, heartbeat REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # A short-lived connection per operation keeps the limiter safe to use from any thread.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _buckets(self):
+        buckets = [("requests", float(self.requests_per_minute))]
+        if self.tokens_per_minute:
+            buckets.append(("tokens", float(self.tokens_per_minute)))
+        return buckets
+
+    def _level(self, conn, kind, capacity, now):
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ? AND kind = ?", (self.name, kind)).fetchone()
+        return capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * capacity / 60.0)
+
+    def _try_acquire(self, waiter_id, priority, enqueued, tokens):
+        """
+        Takes capacity if this waiter is first in line and both buckets allow it.
+
+        Returns 0 on success, otherwise the number of seconds worth waiting before trying again.
+        """
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE") # Serializes the read-modify-write across processes.
+            now = time.time() # Read under the lock, so bucket timestamps only move forward.
+            conn.execute("DELETE FROM waiters WHERE deadline < ? OR heartbeat < ?", (now, now - self.STALE_WAITER_SECONDS))
+            conn.execute("UPDATE waiters SET heartbeat = ? WHERE id = ?", (now, waiter_id))
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM waiters WHERE name = ? AND id != ? AND (priority < ? OR (priority = ? AND enqueued < ?))",
+                (self.name, waiter_id, priority, priority, enqueued)
+            ).fetchone()[0]
+
+            levels = {}
+            wait = 0.0
+            for kind, capacity in self._buckets():
+                level = self._level(conn, kind, capacity, now)
+                levels[kind] = level
+                # Requests larger than the whole bucket are let through once it is full.
+                need = 1.0 if kind == "requests" else min(float(tokens), capacity)
+                if level < need:
+                    wait = max(wait, (need - level) * 60.0 / capacity)
+
+            granted = ahead == 0 and wait == 0.0
+            for kind, capacity in self._buckets():
+                level = levels[kind]
+                if granted:
+                    level -= 1.0 if kind == "requests" else float(tokens)
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, kind, level, updated) VALUES (?, ?, ?, ?)",
+                    (self.name, kind, level, now)
+                )
+            if granted:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if granted:
+            return 0.0
+        return self.poll_interval if ahead else wait
+
+    def adjust(self, tokens):
+        """
+        Debits (tokens > 0) or refunds (tokens < 0) the token bucket outside of acquire().
+
+        Used once a request's real usage is known. A debit may take the level below
+        zero; later callers then wait until the overdraft has refilled.
+        """
+        if not self.tokens_per_minute or not tokens:
+            return
+        capacity = float(self.tokens_per_minute)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            level = min(capacity, self._level(conn, "tokens", capacity, now) - tokens)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, kind, level, updated) VALUES (?, ?, ?, ?)",
+                (self.name, "tokens", level, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _enqueue(self, priority, deadline):
+        waiter_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO waiters (id, name, priority, enqueued, deadline, heartbeat) VALUES (?, ?, ?, ?, ?, ?)",
+                (waiter_id, self.name, priority, now, deadline, now)
+            )
+        return waiter_id, now
+
+    def _dequeue(self, waiter_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+
+    def _deadline(self, priority, timeout):
+        if timeout is None:
+            timeout = PRIORITY_DEADLINES.get(priority, PRIORITY_DEADLINES[BATCH])
+        return time.time() + timeout
+
+    def _record(self, granted, waited):
+        with self._lock:
+            if granted:
+                self.granted += 1
+            else:
+                self.timeouts += 1
+            self.waited_seconds += waited
+
+    def acquire(self, tokens=0, priority=INTERACTIVE, timeout=None):
+        """
+        Blocks until one request and 'tokens' tokens may be spent.
+
+        Args:
+            tokens (int): The tokens the request is expected to use.
+            priority (int): INTERACTIVE, BATCH, or any other class (lower is served first).
+            timeout (float, optional): Seconds to wait at most; defaults to PRIORITY_DEADLINES.
+
+        Raises:
+            RateLimitTimeout: If no capacity could be had before the deadline.
+        """
+        deadline = self._deadline(priority, timeout)
+        waiter_id, enqueued = self._enqueue(priority, deadline)
+        try:
+            while True:
+                now = time.time()
+                wait = self._try_acquire(waiter_id, priority, enqueued, tokens)
+                if wait == 0.0:
+                    self._record(True, now - enqueued)
+                    return
+                if now + min(wait, self.max_sleep) > deadline:
+                    self._record(False, now - enqueued)
+                    raise RateLimitTimeout(f"Rate limit '{self.name}': no capacity within {deadline - enqueued:.1f}s")
+                time.sleep(min(wait, self.max_sleep))
+        finally:
+            self._dequeue(waiter_id)
+
+    async def aacquire(self, tokens=0, priority=INTERACTIVE, timeout=None):
+        """
+        The asyncio version of acquire(); the event loop keeps running while waiting.
+        """
+        deadline = self._deadline(priority, timeout)
+        waiter_id, enqueued = await asyncio.to_thread(self._enqueue, priority, deadline)
+        try:
+            while True:
+                now = time.time()
+                wait = await asyncio.to_thread(self._try_acquire, waiter_id, priority, enqueued, tokens)
+                if wait == 0.0:
+                    self._record(True, now - enqueued)
+                    return
+                if now + min(wait, self.max_sleep) > deadline:
+                    self._record(False, now - enqueued)
+                    raise RateLimitTimeout(f"Rate limit '{self.name}': no capacity within {deadline - enqueued:.1f}s")
+                await asyncio.sleep(min(wait, self.max_sleep))
+        finally:
+            await asyncio.to_thread(self._dequeue, waiter_id)
+
+    def stats(self):
+        """
+        Returns this process's grant/timeout counters plus the shared bucket levels and queue depth per priority.
+        """
+        with self._connect() as conn:
+            levels = dict(conn.execute("SELECT kind, level FROM buckets WHERE name = ?", (self.name,)).fetchall())
+            queued = dict(conn.execute(
+                "SELECT priority, COUNT(*) FROM waiters WHERE name = ? GROUP BY priority", (self.name,)
+            ).fetchall())
+        with self._lock:
+            return {
+                "granted": self.granted,
+                "timeouts": self.timeouts,
+                "waited_seconds": self.waited_seconds,
+                "levels": levels,
+                "queued": queued
+            }
+
+_limiters = {}
+_adapters = {}
+_reconcilers = {}
+_registry_lock = threading.Lock()
+
+def get_shared_limiter(provider):
+    """
+    Returns the process-wide SharedRateLimiter for a provider, or None if it has no limits configured.
+
+    Limits come from <PROVIDER>_REQUESTS_PER_MINUTE and <PROVIDER>_TOKENS_PER_MINUTE
+    (e.g. COHERE_REQUESTS_PER_MINUTE), falling back to DEFAULT_LIMITS.
+    """
+    with _registry_lock:
+        if provider in _limiters:
+            return _limiters[provider]
+        prefix = provider.upper().replace("-", "_")
+        default_requests, default_tokens = DEFAULT_LIMITS.get(provider, (None, None))
+        requests = os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", default_requests)
+        tokens = os.getenv(f"{prefix}_TOKENS_PER_MINUTE", default_tokens)
+        limiter = None
+        if requests is not None and float(requests) > 0:
+            limiter = SharedRateLimiter(provider, float(requests), float(tokens) if tokens else None)
+        _limiters[provider] = limiter
+        return limiter
+
+def get_langchain_rate_limiter(provider, priority=INTERACTIVE, tokens=TOKENS_PER_CHAT_REQUEST):
+    """
+    Returns a LangChain rate limiter (the chat models' 'rate_limiter' field) backed by the provider's shared limiter.
+
+    The same object is returned for the same arguments, so clients built with it stay reusable in the registry.
+    """
+    limiter = get_shared_limiter(provider)
+    if limiter is None:
+        return None
+    key = (provider, priority, tokens)
+    with _registry_lock:
+        adapter = _adapters.get(key)
+        if adapter is None:
+            from langchain_core.rate_limiters import BaseRateLimiter # Imported lazily like the clients that use it.
+
+            class SharedLimiterAdapter(BaseRateLimiter):
+                def acquire(self, *, blocking=True):
+                    try:
+                        limiter.acquire(tokens, priority, timeout=None if blocking else 0)
+                    except RateLimitTimeout:
+                        if blocking:
+                            raise
+                        return False
+                    return True
+
+                async def aacquire(self, *, blocking=True):
+                    try:
+                        await limiter.aacquire(tokens, priority, timeout=None if blocking else 0)
+                    except RateLimitTimeout:
+                        if blocking:
+                            raise
+                        return False
+                    return True
+
+            adapter = _adapters[key] = SharedLimiterAdapter()
+        return adapter
+
+def get_token_reconciler(provider, tokens=TOKENS_PER_CHAT_REQUEST):
+    """
+    Returns a LangChain callback handler that settles the provider's token bucket with each response's real usage.
+
+    get_langchain_rate_limiter() charges a flat 'tokens' per request before the call;
+    when the call ends, the handler debits or refunds the difference to the input
+    and output tokens the model reported. Returns None if the provider has no limiter.
+    """
+    limiter = get_shared_limiter(provider)
+    if limiter is None:
+        return None
+    key = (provider, tokens)
+    with _registry_lock:
+        reconciler = _reconcilers.get(key)
+        if reconciler is None:
+            from langchain_core.callbacks import BaseCallbackHandler
+            from common.llm_callbacks import _token_usage
+
+            class TokenReconciler(BaseCallbackHandler):
+                def on_llm_end(self, response, **kwargs):
+                    used = sum(_token_usage(response))
+                    if used: # Responses without usage keep the up-front charge.
+                        limiter.adjust(used - tokens)
+
+            reconciler = _reconcilers[key] = TokenReconciler()
+        return reconciler
+
+def estimate_tokens(texts):
+    # About four characters per token, as in the knowledge base's context packing.
+    return sum(len(text) for text in texts) // 4 + 1
+
+def rate_limited_embeddings(embeddings, limiter, priority=INTERACTIVE, document_priority=BATCH):
+    """
+    Wraps a LangChain Embeddings object so every call first takes capacity from 'limiter'.
+
+    Queries are limited with 'priority'; document embedding (ingestion) is
+    background work and uses 'document_priority', so it waits behind queries
+    with the longer batch deadline instead of timing out like an interactive call.
+    """
+    from langchain_core.embeddings import Embeddings
+
+    class RateLimitedEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            limiter.acquire(estimate_tokens(texts), document_priority)
+            return embeddings.embed_documents(texts)
+
+        def embed_query(self, text):
+            limiter.acquire(estimate_tokens([text]), priority)
+            return embeddings.embed_query(text)
+
+        async def aembed_documents(self, texts):
+            await limiter.aacquire(estimate_tokens(texts), document_priority)
+            return await embeddings.aembed_documents(texts)
+
+        async def aembed_query(self, text):
+            await limiter.aacquire(estimate_tokens([text]), priority)
+            return await embeddings.aembed_query(text)
+
+    return RateLimitedEmbeddings()
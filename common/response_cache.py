@@ -0,0 +1,170 @@
+import hashlib # For hashing cache keys.
+import json # For serializing key parts deterministically.
+import os # For the default database location.
+import sqlite3 # For the persistent on-disk tier.
+import threading # For sharing one cache between Streamlit sessions.
+import time # For TTL expiry and latency measurement.
+from collections import OrderedDict # For the in-memory LRU tier.
+
+# Default location of the on-disk tier, shared by every app that uses the cache.
+DEFAULT_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join("data", "response_cache.sqlite3"))
+
+def make_cache_key(model, temperature, prompt, prompt_version, **params):
+    """
+    Builds a cache key from everything that determines an LLM response.
+
+    Args:
+        model (str): The model name.
+        temperature (float): The sampling temperature.
+        prompt (str): The fully rendered prompt sent to the model.
+        prompt_version (str): Bumped whenever a prompt template changes meaning.
+        **params: Any other generation parameters that affect the output.
+
+    Returns:
+        str: A hex-encoded SHA-256 digest.
+    """
+    parts = {"model": model, "temperature": temperature, "prompt": prompt, "prompt_version": prompt_version, **params}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    A two-tier LRU/TTL cache for LLM responses.
+
+    Lookups hit an in-memory LRU first and fall back to a SQLite file, so cached
+    responses survive restarts and are shared by every process using the same
+    file. Each entry remembers how long the original call took, which is
+    reported as saved latency whenever it is served from the cache.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_memory_entries=256, max_disk_entries=10000, ttl_seconds=24 * 3600, max_disk_bytes=None):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict() # key -> (value, created_at, latency)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, "
+                "last_access REAL NOT NULL, latency REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def _connect(self):
+        # A short-lived connection per operation keeps the cache safe to use from any thread.
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _remember(self, key, value, created_at, latency):
+        self._memory[key] = (value, created_at, latency)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Returns the cached value for a key, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+            self._memory.pop(key, None)
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at, latency FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.saved_seconds += row[2]
+            self._remember(key, row[0], row[1], row[2])
+            return row[0]
+
+    def set(self, key, value, latency=0.0):
+        """
+        Stores a value in both tiers, evicting the least recently used entries beyond the size limits.
+
+        Args:
+            key (str): The cache key, see make_cache_key().
+            value (str): The response text.
+            latency (float): How long producing the value took, in seconds.
+
+        Entries beyond 'max_disk_entries', or beyond 'max_disk_bytes' of values when that is set, are evicted.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now, latency)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access, latency) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, latency)
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+            if self.max_disk_bytes is not None:
+                # Keep the most recently used entries whose values fit in the byte budget.
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM ("
+                    "SELECT key, SUM(length(CAST(value AS BLOB))) OVER (ORDER BY last_access DESC, key) AS total FROM responses"
+                    ") WHERE total > ?)",
+                    (self.max_disk_bytes,)
+                )
+
+    def get_or_call(self, key, call, enabled=True):
+        """
+        Returns the cached value for a key, or calls 'call()' and caches its result.
+
+        Args:
+            key (str): The cache key, see make_cache_key().
+            call (callable): Produces the value on a miss.
+            enabled (bool): False bypasses the cache entirely, e.g. when fresh samples are wanted.
+
+        Returns:
+            str: The cached or freshly produced value.
+        """
+        if not enabled:
+            return call()
+        value = self.get(key)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = call()
+        self.set(key, value, time.perf_counter() - start)
+        return value
+
+    def stats(self):
+        """
+        Returns hit/miss counters, the hit ratio and the total latency saved.
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "memory_entries": len(self._memory)
+            }
@@ -0,0 +1,220 @@
+import threading # For coordinating concurrent sessions and pumping shared streams.
+
+class _Call:
+    """
+    One in-flight upstream call and the outcome shared by everyone waiting on it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _Broadcast:
+    """
+    One in-flight upstream stream whose chunks are fanned out to every subscriber.
+
+    Chunks are buffered as they arrive, so a session that joins late still
+    receives the stream from the beginning. When the last subscriber goes away
+    the upstream stream is cancelled, so nobody pays for tokens no one reads.
+    The subscriber count is guarded by the lock of the owning SingleFlight.
+    """
+
+    def __init__(self, lock):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self.upstream = None
+        self.condition = threading.Condition(lock)
+
+    def pump(self, stream):
+        self.upstream = stream
+        try:
+            for chunk in stream:
+                with self.condition:
+                    self.chunks.append(chunk)
+                    self.condition.notify_all()
+                    abandoned = self.subscribers == 0
+                if abandoned:
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+
+    def read(self):
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.chunks) and not self.finished:
+                    self.condition.wait()
+                pending = self.chunks[index:]
+                finished = self.finished
+            yield from pending
+            index += len(pending)
+            if finished and index >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def unsubscribe(self):
+        with self.condition:
+            self.subscribers -= 1
+            abandoned = self.subscribers == 0 and not self.finished
+        # Cancellable upstreams (see AsyncIteratorStream) are aborted immediately;
+        # plain iterators are closed by the pump once their next chunk arrives.
+        cancel = getattr(self.upstream, "cancel", None)
+        if abandoned and cancel is not None:
+            cancel()
+
+class _Subscription:
+    """
+    One caller's iterator over a broadcast.
+
+    It holds its place in the subscriber count from the moment it is created
+    and gives it up exactly once: when the stream ends, when close() is called,
+    or when it is garbage collected without ever being iterated.
+    """
+
+    def __init__(self, broadcast):
+        self._broadcast = broadcast
+        self._chunks = broadcast.read()
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._chunks)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._chunks.close()
+        self._broadcast.unsubscribe()
+
+    def __del__(self):
+        self.close()
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests into a single upstream call.
+
+    While a call for a key is in flight, further requests with the same key wait
+    for it and share its result instead of sending their own request. Keys should
+    cover the model, parameters and rendered prompt, e.g. via make_cache_key().
+    """
+
+    def __init__(self):
+        # Reentrant, because a dropped subscription may be garbage collected (and release
+        # its place) while this thread already holds the lock.
+        self._lock = threading.RLock()
+        self._calls = {}
+        self._streams = {}
+        self.requests = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def do(self, key, call):
+        """
+        Runs 'call()' once for all concurrent callers with the same key and returns its result.
+
+        Exceptions raised by the upstream call are re-raised in every waiting caller.
+        """
+        with self._lock:
+            self.requests += 1
+            shared = self._calls.get(key)
+            if shared is None:
+                shared = self._calls[key] = _Call()
+                self.upstream_calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            try:
+                shared.result = call()
+            except Exception as e:
+                shared.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                shared.done.set()
+        else:
+            shared.done.wait()
+
+        if shared.error is not None:
+            raise shared.error
+        return shared.result
+
+    def stream(self, key, make_stream):
+        """
+        Returns an iterator over a stream shared by all concurrent callers with the same key.
+
+        The first caller starts 'make_stream()' on a background thread that reads
+        the upstream stream to completion; every caller, including the first,
+        receives the same chunks in the same order. Because the background thread
+        owns the upstream stream, it keeps flowing to the other sessions even if the
+        session that started it goes away; once every caller has stopped reading,
+        the upstream stream is cancelled. The returned iterator has a close() method,
+        and a caller that drops it without reading still releases its place.
+        """
+        with self._lock:
+            self.requests += 1
+            broadcast = self._streams.get(key)
+            # A stream everyone has left is being cancelled, so it cannot be joined.
+            if broadcast is None or broadcast.subscribers == 0:
+                broadcast = self._streams[key] = _Broadcast(self._lock)
+                self.upstream_calls += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+            # Counted before the pump starts, so the first chunk never finds the stream abandoned.
+            broadcast.subscribers += 1
+            subscription = _Subscription(broadcast)
+
+        if leader:
+            def pump():
+                try:
+                    broadcast.pump(make_stream())
+                except Exception as e: # make_stream() itself failed.
+                    broadcast.error = e
+                    with broadcast.condition:
+                        broadcast.finished = True
+                        broadcast.condition.notify_all()
+                finally:
+                    with self._lock:
+                        if self._streams.get(key) is broadcast:
+                            del self._streams[key]
+
+            threading.Thread(target=pump, name="single-flight-stream", daemon=True).start()
+        return subscription
+
+    def stats(self):
+        """
+        Returns the number of requests, upstream calls and coalesced requests so far.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._streams)
+            }
+
+# Process-wide instance shared by every app, so identical requests from different
+# Streamlit sessions (which run as threads of one process) are coalesced.
+single_flight = SingleFlight()
@@ -0,0 +1,107 @@
+import threading # For sharing one cache safely between Streamlit sessions.
+import time # For TTL expiry and pacing replayed answers.
+from collections import OrderedDict # For least-recently-used ordering of cache entries.
+from dataclasses import dataclass # For cache entry records.
+import numpy as np # For vectorized cosine similarity against cached queries.
+from knowledge_based_chatbot.vector_index import normalize # For unit-length query embeddings.
+
+@dataclass
+class CachedAnswer:
+    """
+    One answered query: the question, its embedding, the chunks it was answered from and the answer.
+    """
+    doc_hash: str
+    query: str
+    embedding: np.ndarray
+    chunk_ids: list
+    answer: str
+    created_at: float
+
+class SemanticAnswerCache:
+    """
+    An in-memory LRU/TTL cache of RAG answers, looked up by query embedding similarity.
+
+    A new query is a hit when a cached query for the same document has a cosine
+    similarity of at least 'threshold' with it, so paraphrased questions reuse the
+    stored answer instead of paying for retrieval and generation again.
+    """
+
+    def __init__(self, threshold=0.95, max_entries=512, ttl_seconds=3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expire(self, now):
+        # Entries are kept in recency order, not age order, so every entry is checked.
+        expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        self.evictions += len(expired)
+
+    def lookup(self, doc_hash, query_embedding):
+        """
+        Returns the most similar cached answer for the document, or None on a miss.
+
+        Args:
+            doc_hash (str): The content hash of the document being queried.
+            query_embedding (list): The embedding of the new query.
+
+        Returns:
+            CachedAnswer | None: The cached answer if its similarity reaches the threshold.
+        """
+        query = normalize(query_embedding)
+        with self._lock:
+            self._expire(time.time())
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry.doc_hash == doc_hash]
+            if candidates:
+                scores = np.stack([entry.embedding for _, entry in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def store(self, doc_hash, query, query_embedding, chunk_ids, answer):
+        """
+        Adds an answered query to the cache, evicting the least recently used entries when full.
+        """
+        entry = CachedAnswer(doc_hash, query, normalize(query_embedding), list(chunk_ids), answer, time.time())
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the hit/miss counters and current size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries)
+            }
+
+def replay_answer(answer, words_per_chunk=4, delay=0.01):
+    """
+    Yields a cached answer in small pieces so it can be shown with st.write_stream().
+    """
+    words = answer.split(" ")
+    for i in range(0, len(words), words_per_chunk):
+        piece = " ".join(words[i:i + words_per_chunk])
+        yield piece if i + words_per_chunk >= len(words) else piece + " "
+        time.sleep(delay)
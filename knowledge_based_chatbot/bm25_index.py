@@ -0,0 +1,143 @@
+import heapq # For picking the top-k scores without sorting every candidate.
+import json # For persisting the index next to the vector store.
+import math # For the BM25 inverse document frequency.
+import os # For atomically replacing the index file.
+import re # For tokenizing text into words and identifiers.
+from collections import Counter, defaultdict # For term frequencies and postings lists.
+from langchain.schema import Document # For returning search results in the same shape as the vector store.
+
+# Words, numbers and identifiers such as "ERR-4021", "v2.3.1" or "part_no_77" are kept whole.
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+(?:[-_./:][A-Za-z0-9]+)*")
+SUBTOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+def tokenize(text):
+    """
+    Lowercases and tokenizes text for lexical search.
+
+    Compound identifiers are emitted both whole and as their parts, so "ERR-4021"
+    matches a query for "ERR-4021" exactly and still matches a query for "4021".
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        parts = SUBTOKEN_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+class BM25Index:
+    """
+    An inverted index over document chunks scored with Okapi BM25.
+
+    Chunks are added once at ingest time. A query only touches the postings of its
+    own terms, so lexical search runs locally on every query without a network call.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.doc_lengths = []
+        self.postings = defaultdict(list) # term -> [(row, term frequency), ...]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, chunk_id, text, metadata):
+        """
+        Indexes one chunk under its vector store id.
+        """
+        row = len(self.ids)
+        tokens = tokenize(text)
+        self.ids.append(chunk_id)
+        self.texts.append(text)
+        self.metadatas.append(metadata)
+        self.doc_lengths.append(len(tokens))
+        for term, freq in Counter(tokens).items():
+            self.postings[term].append((row, freq))
+
+    def search(self, query, k=10):
+        """
+        Returns the top-k (Document, score) pairs for a query, best first.
+        """
+        if not self.ids:
+            return []
+        n = len(self.ids)
+        avg_length = sum(self.doc_lengths) / n or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[row] / avg_length)
+                scores[row] += idf * freq * (self.k1 + 1) / (freq + norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(Document(page_content=self.texts[row], metadata=self.metadatas[row]), score) for row, score in top]
+
+    def save(self, path):
+        """
+        Writes the index to a JSON file, replacing any previous version atomically.
+        """
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index written by save().
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.ids = data["ids"]
+        index.texts = data["texts"]
+        index.metadatas = data["metadatas"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = defaultdict(list, {term: [tuple(p) for p in postings] for term, postings in data["postings"].items()})
+        return index
+
+def reciprocal_rank_fusion(result_lists, key, k=60, limit=None, with_scores=False):
+    """
+    Merges several ranked result lists with reciprocal rank fusion.
+
+    Each item scores sum(1 / (k + rank)) over the lists it appears in, so items
+    ranked well by both the lexical and the dense retriever rise to the top
+    without having to calibrate their raw scores against each other.
+
+    Args:
+        result_lists (list): Ranked lists of items, best first.
+        key (callable): Returns the identity of an item, e.g. its chunk id.
+        k (int): The RRF damping constant.
+        limit (int, optional): The number of fused items to return.
+        with_scores (bool): Return (item, fused score) pairs instead of bare items.
+
+    Returns:
+        list: The fused items, best first.
+    """
+    scores = defaultdict(float)
+    items = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            item_key = key(item)
+            scores[item_key] += 1.0 / (k + rank)
+            items.setdefault(item_key, item)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    if with_scores:
+        return [(items[item_key], scores[item_key]) for item_key in ranked[:limit]]
+    return [items[item_key] for item_key in ranked[:limit]]
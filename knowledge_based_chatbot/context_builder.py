@@ -0,0 +1,120 @@
+import math # For the bag-of-words cosine similarity and token estimates.
+from collections import Counter # For term frequency vectors.
+from langchain.schema import Document # For merged context blocks.
+from knowledge_based_chatbot.bm25_index import tokenize # For the same tokenization as keyword search.
+
+# Roughly four characters per token for English text; good enough to size a budget
+# without shipping the model's tokenizer.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    """
+    Estimates the number of prompt tokens a piece of text will use.
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _cosine(a, b):
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+def mmr_order(candidates, lambda_mult=0.7):
+    """
+    Orders candidates by maximal marginal relevance.
+
+    Each step picks the candidate that best balances its retrieval score against
+    its similarity to the chunks already picked, so overlapping chunks and
+    near-duplicate pages drop to the back. Similarity is a bag-of-words cosine,
+    which catches overlap and duplicates without another embedding call.
+
+    Args:
+        candidates (list): (Document, score) pairs, best first.
+        lambda_mult (float): 1.0 ranks by relevance only, 0.0 by diversity only.
+
+    Returns:
+        list: The same pairs in MMR order.
+    """
+    if not candidates:
+        return []
+    top_score = max(score for _, score in candidates) or 1.0
+    vectors = [Counter(tokenize(doc.page_content)) for doc, _ in candidates]
+    remaining = list(range(len(candidates)))
+    max_similarity = [0.0] * len(candidates)
+    ordered = []
+    while remaining:
+        best = max(
+            remaining,
+            key=lambda i: lambda_mult * candidates[i][1] / top_score - (1 - lambda_mult) * max_similarity[i]
+        )
+        remaining.remove(best)
+        ordered.append(candidates[best])
+        for i in remaining:
+            max_similarity[i] = max(max_similarity[i], _cosine(vectors[i], vectors[best]))
+    return ordered
+
+def _join_overlapping(first, second, max_overlap):
+    # The splitter repeats up to 'chunk_overlap' characters at the start of the next chunk.
+    for size in range(min(max_overlap, len(first), len(second)), 0, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + " " + second
+
+def merge_adjacent(docs, max_overlap):
+    """
+    Merges chunks that are consecutive on the same page into a single block.
+
+    Each block takes the position of its highest-ranked chunk, and the overlap
+    repeated between consecutive chunks is only included once.
+    """
+    def page_key(doc):
+        return (doc.metadata.get("doc_id", doc.metadata.get("source")), doc.metadata.get("page"))
+
+    by_page = {}
+    for rank, doc in enumerate(docs):
+        by_page.setdefault(page_key(doc), []).append((rank, doc))
+
+    blocks = []
+    for page_docs in by_page.values():
+        page_docs.sort(key=lambda item: item[1].metadata.get("chunk_index", 0))
+        rank, current = page_docs[0]
+        text = current.page_content
+        last_index = current.metadata.get("chunk_index", 0)
+        for next_rank, doc in page_docs[1:]:
+            index = doc.metadata.get("chunk_index", 0)
+            if index == last_index + 1:
+                text = _join_overlapping(text, doc.page_content, max_overlap)
+                rank = min(rank, next_rank)
+            else:
+                blocks.append((rank, Document(page_content=text, metadata=current.metadata)))
+                rank, current, text = next_rank, doc, doc.page_content
+            last_index = index
+        blocks.append((rank, Document(page_content=text, metadata=current.metadata)))
+    return [doc for _, doc in sorted(blocks, key=lambda block: block[0])]
+
+def build_context(candidates, token_budget, max_overlap, lambda_mult=0.7, separator="\n\n"):
+    """
+    Packs the most useful, least redundant chunks into a token budget.
+
+    Candidates are ordered by MMR and added greedily while they fit the budget;
+    chunks that are consecutive on the same page are then merged into one block.
+
+    Args:
+        candidates (list): Over-fetched (Document, score) pairs, best first.
+        token_budget (int): The approximate number of tokens the context may use.
+        max_overlap (int): The splitter's chunk overlap in characters.
+        lambda_mult (float): The MMR relevance/diversity trade-off.
+        separator (str): Inserted between context blocks.
+
+    Returns:
+        tuple: (context text, selected chunk Documents before merging).
+    """
+    selected = []
+    used = 0
+    for doc, _ in mmr_order(candidates, lambda_mult):
+        cost = estimate_tokens(doc.page_content) + estimate_tokens(separator)
+        if used + cost > token_budget:
+            continue # A smaller, lower-ranked chunk may still fit.
+        selected.append(doc)
+        used += cost
+    blocks = merge_adjacent(selected, max_overlap)
+    return separator.join(block.page_content for block in blocks), selected
@@ -0,0 +1,172 @@
+import json # For the persisted document registry.
+import os # For file paths and measuring the index size on disk.
+import threading # For serializing registry updates between Streamlit sessions.
+import time # For recording when a document was added.
+from langchain.vectorstores import Chroma # For the shared corpus collection.
+from knowledge_based_chatbot.bm25_index import BM25Index, reciprocal_rank_fusion # For per-document keyword search.
+from knowledge_based_chatbot.ingestion import IngestStats, chunk_id, ingest_chunks # For streaming chunks into the collection.
+
+REGISTRY_FILE = "corpus.json"
+COLLECTION_NAME = "corpus"
+
+class Corpus:
+    """
+    A persistent multi-document knowledge base with incremental add and remove.
+
+    Every document's chunks live in one shared Chroma collection, tagged with a
+    'doc_id' metadata field (the first 16 characters of the document hash), so
+    adding a document only embeds that document and removing one deletes its
+    chunks by id. A registry file records each document's name and chunk count.
+    Keyword search uses each document's own BM25 index.
+    """
+
+    def __init__(self, path, embeddings, bm25_path_for):
+        """
+        Args:
+            path (str): The directory holding the corpus collection and registry.
+            embeddings: The embeddings client used for the collection.
+            bm25_path_for (callable): Maps a document hash to its BM25 index path.
+        """
+        self.path = path
+        self.bm25_path_for = bm25_path_for
+        os.makedirs(path, exist_ok=True)
+        self.db = Chroma(
+            collection_name=COLLECTION_NAME,
+            embedding_function=embeddings,
+            persist_directory=os.path.join(path, "chroma")
+        )
+        self._lock = threading.Lock()
+        self._bm25 = {}
+        self._registry_path = os.path.join(path, REGISTRY_FILE)
+        if os.path.exists(self._registry_path):
+            with open(self._registry_path) as f:
+                self.documents = json.load(f)
+        else:
+            self.documents = {}
+
+    def _save_registry(self):
+        with open(self._registry_path + ".tmp", "w") as f:
+            json.dump(self.documents, f, indent=2)
+        os.replace(self._registry_path + ".tmp", self._registry_path)
+
+    def _get_bm25(self, doc_id):
+        if doc_id not in self._bm25:
+            bm25 = BM25Index.load(self.bm25_path_for(self.documents[doc_id]["doc_hash"]))
+            # The file may have been rewritten by single PDF mode, which does not tag chunks.
+            for metadata in bm25.metadatas:
+                metadata.setdefault("doc_id", doc_id)
+            self._bm25[doc_id] = bm25
+        return self._bm25[doc_id]
+
+    def add_document(self, doc_hash, name, chunks, stats=None, **ingest_options):
+        """
+        Embeds a document's chunks into the corpus collection and registers it.
+
+        Documents already in the corpus are skipped, so re-adding a file costs nothing.
+
+        Args:
+            doc_hash (str): The content hash of the document.
+            name (str): The display name, usually the uploaded file name.
+            chunks (iterable): The document's chunks.
+            stats (IngestStats, optional): Counters to update during ingestion.
+            **ingest_options: Passed to ingest_chunks(), e.g. batch_size or on_progress.
+
+        Returns:
+            bool: True if the document was added, False if it was already present.
+        """
+        doc_id = doc_hash[:16]
+        if doc_id in self.documents:
+            return False
+        # Drop chunks left behind by an earlier add of this document that did not finish.
+        self._delete_chunks(doc_id)
+
+        bm25 = BM25Index()
+
+        def tag(chunks):
+            for chunk in chunks:
+                chunk.metadata["doc_id"] = doc_id
+                chunk.metadata["doc_name"] = name
+                bm25.add(chunk_id(doc_id, chunk), chunk.page_content, chunk.metadata)
+                yield chunk
+
+        stats = ingest_chunks(tag(chunks), self.db, id_prefix=doc_id, stats=stats or IngestStats(), **ingest_options)
+        bm25.save(self.bm25_path_for(doc_hash))
+
+        with self._lock:
+            self._bm25[doc_id] = bm25
+            self.documents[doc_id] = {
+                "doc_hash": doc_hash,
+                "name": name,
+                "chunks": stats.chunks,
+                "pages": stats.pages,
+                "added_at": time.time()
+            }
+            self._save_registry()
+        return True
+
+    def _delete_chunks(self, doc_id):
+        ids = self.db.get(where={"doc_id": doc_id})["ids"]
+        if ids:
+            self.db.delete(ids=ids)
+        return len(ids)
+
+    def remove_document(self, doc_id):
+        """
+        Deletes a document's chunks from the collection and unregisters it.
+
+        Returns:
+            int: The number of chunks deleted.
+        """
+        deleted = self._delete_chunks(doc_id)
+        with self._lock:
+            self.documents.pop(doc_id, None)
+            self._bm25.pop(doc_id, None)
+            self._save_registry()
+        return deleted
+
+    def index_size(self):
+        """
+        Returns the size of the corpus collection on disk in bytes.
+        """
+        total = 0
+        for root, _, files in os.walk(self.path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+    def hybrid_search(self, query, query_embedding, doc_ids=None, k=3, candidates=10):
+        """
+        Retrieves context chunks from the whole corpus or a subset of its documents.
+
+        Dense results come from one filtered query against the shared collection;
+        keyword results come from each selected document's own BM25 index. Those
+        scores use per-document IDF and are not comparable, so the per-document
+        rankings are fused by rank first, and then merged with the dense ranking,
+        both with reciprocal rank fusion.
+
+        Args:
+            query (str): The user's query.
+            query_embedding (list): The embedding of the query.
+            doc_ids (list, optional): Restrict the search to these documents; defaults to all.
+            k (int): The number of chunks to return.
+            candidates (int): The number of chunks fetched from each retriever.
+
+        Returns:
+            list: (Document, fused score) pairs, best first.
+        """
+        doc_ids = [doc_id for doc_id in (doc_ids or self.documents) if doc_id in self.documents]
+        if not doc_ids:
+            return []
+        where = {"doc_id": doc_ids[0]} if len(doc_ids) == 1 else {"doc_id": {"$in": doc_ids}}
+        dense = self.db.similarity_search_by_vector(query_embedding, k=candidates, filter=where)
+        key = lambda doc: chunk_id(doc.metadata["doc_id"], doc)
+        lexical = reciprocal_rank_fusion(
+            [[doc for doc, _ in self._get_bm25(doc_id).search(query, k=candidates)] for doc_id in doc_ids],
+            key=key,
+            limit=candidates
+        )
+        return reciprocal_rank_fusion(
+            [dense, lexical],
+            key=key,
+            limit=k,
+            with_scores=True
+        )
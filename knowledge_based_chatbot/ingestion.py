@@ -0,0 +1,236 @@
+import multiprocessing # For choosing a safe start method for parser processes.
+import os # For determining the number of available CPU cores.
+import random # For adding jitter to retry backoff delays.
+import time # For measuring throughput and sleeping between retries.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait # For parallel parsing and embedding.
+from dataclasses import dataclass, field # For the ingestion statistics record.
+from langchain.document_loaders import PyPDFLoader # For loading PDF documents page by page.
+from langchain.schema import Document # For rebuilding chunks produced by parser processes.
+from langchain.text_splitter import RecursiveCharacterTextSplitter # For splitting pages inside parser processes.
+from pypdf import PdfReader # For random access to page ranges of a PDF.
+from common.rate_limiter import RateLimitTimeout # For not retrying batches the shared limiter gave up on.
+
+@dataclass
+class IngestStats:
+    """
+    Running counters for one ingestion run, reported through the progress callback.
+    """
+    pages: int = 0
+    chunks: int = 0
+    batches: int = 0
+    retries: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def pages_per_sec(self):
+        return self.pages / self.elapsed
+
+    @property
+    def chunks_per_sec(self):
+        return self.chunks / self.elapsed
+
+def iter_pdf_chunks(path, splitter, stats=None):
+    """
+    Lazily parses a PDF and yields its text chunks page by page.
+
+    Pages are split as soon as they are parsed, so the first chunks are available
+    long before the whole document has been read.
+
+    Args:
+        path (str): The file path to the PDF document.
+        splitter: A LangChain text splitter used to split each page.
+        stats (IngestStats, optional): Counters updated with the number of pages parsed.
+
+    Yields:
+        Document: A text chunk with 'page' and 'chunk_index' metadata.
+    """
+    for page in PyPDFLoader(path).lazy_load():
+        if stats is not None:
+            stats.pages += 1
+        for chunk_index, chunk in enumerate(splitter.split_documents([page])):
+            chunk.metadata["chunk_index"] = chunk_index
+            yield chunk
+
+def parse_page_range(path, start, end, chunk_size, chunk_overlap):
+    """
+    Extracts and splits the pages [start, end) of a PDF. Runs inside a parser process.
+
+    The chunks are returned as plain (text, metadata) tuples, which are cheaper to
+    send back to the parent process than Document objects.
+
+    Args:
+        path (str): The file path to the PDF document.
+        start (int): The first page to parse (0-based).
+        end (int): One past the last page to parse.
+        chunk_size (int): The splitter chunk size.
+        chunk_overlap (int): The splitter chunk overlap.
+
+    Returns:
+        list: (text, metadata) tuples in page and chunk order.
+    """
+    reader = PdfReader(path)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    for page_number in range(start, end):
+        text = reader.pages[page_number].extract_text() or ""
+        metadata = {"source": path, "page": page_number, "total_pages": len(reader.pages)}
+        for chunk_index, chunk in enumerate(splitter.split_documents([Document(page_content=text, metadata=metadata)])):
+            chunk.metadata["chunk_index"] = chunk_index
+            chunks.append((chunk.page_content, chunk.metadata))
+    return chunks
+
+def iter_pdf_chunks_parallel(path, chunk_size, chunk_overlap, stats=None, max_workers=None, pages_per_task=16):
+    """
+    Parses and splits a PDF in parallel across processes, yielding chunks in document order.
+
+    The document is cut into page ranges of 'pages_per_task' pages, each range is
+    parsed and split in a worker process, and the results are merged back in page
+    order. Chunks carry the same 'page' and 'chunk_index' metadata as
+    iter_pdf_chunks(), so both loaders produce identical chunk ids.
+
+    Args:
+        path (str): The file path to the PDF document.
+        chunk_size (int): The splitter chunk size.
+        chunk_overlap (int): The splitter chunk overlap.
+        stats (IngestStats, optional): Counters updated with the number of pages parsed.
+        max_workers (int, optional): The number of parser processes; defaults to the CPU count.
+        pages_per_task (int): The number of pages handed to a worker at a time.
+
+    Yields:
+        Document: A text chunk with 'page' and 'chunk_index' metadata.
+    """
+    page_count = len(PdfReader(path).pages)
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(ranges))
+
+    if max_workers <= 1:
+        # Not worth starting processes for a single range; parse in this process instead.
+        results = (parse_page_range(path, start, end, chunk_size, chunk_overlap) for start, end in ranges)
+        yield from _merge_ranges(ranges, results, stats)
+        return
+
+    # 'spawn' avoids forking a multi-threaded Streamlit server process.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        results = executor.map(
+            parse_page_range,
+            [path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges],
+            [chunk_size] * len(ranges),
+            [chunk_overlap] * len(ranges)
+        )
+        # executor.map returns results in submission order, which keeps the document order stable.
+        yield from _merge_ranges(ranges, results, stats)
+
+def _merge_ranges(ranges, results, stats):
+    for (start, end), chunks in zip(ranges, results):
+        if stats is not None:
+            stats.pages += end - start
+        for text, metadata in chunks:
+            yield Document(page_content=text, metadata=metadata)
+
+def iter_batches(items, batch_size):
+    """
+    Groups an iterable into lists of at most 'batch_size' items.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def chunk_id(id_prefix, chunk):
+    """
+    Builds a deterministic vector store id for a chunk, so retried batches overwrite instead of duplicating.
+    """
+    return f"{id_prefix}-{chunk.metadata.get('page', 0)}-{chunk.metadata.get('chunk_index', 0)}"
+
+def add_batch_with_retry(db, batch, id_prefix, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """
+    Embeds one batch of chunks and writes it into the vector store, retrying on failure.
+
+    Failed attempts are retried with exponential backoff and full jitter, which
+    spreads retries out when the embedding API is rate limiting us. A
+    RateLimitTimeout from the shared limiter is raised right away, since its
+    deadline has already been spent waiting.
+
+    Args:
+        db: The vector store; its add_texts() embeds and stores the batch.
+        batch (list): The chunks to add.
+        id_prefix (str): Prefix for the chunk ids, usually the document hash.
+        max_retries (int): How many times a failed batch is retried before giving up.
+        base_delay (float): The delay in seconds before the first retry.
+        max_delay (float): The upper bound for a single retry delay.
+
+    Returns:
+        tuple[int, int]: The number of chunks written and the number of retries it took.
+    """
+    texts = [chunk.page_content for chunk in batch]
+    metadatas = [chunk.metadata for chunk in batch]
+    ids = [chunk_id(id_prefix, chunk) for chunk in batch]
+    for attempt in range(max_retries + 1):
+        try:
+            db.add_texts(texts, metadatas=metadatas, ids=ids)
+            return len(batch), attempt
+        except RateLimitTimeout:
+            raise # The shared limiter already waited out its deadline; retrying would only queue again.
+        except Exception:
+            if attempt == max_retries:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+def ingest_chunks(chunks, db, id_prefix, stats=None, batch_size=64, max_workers=4, on_progress=None, **retry_options):
+    """
+    Streams chunks into a vector store in fixed-size batches using a bounded thread pool.
+
+    At most 'max_workers' batches are in flight at once; the chunk iterator is only
+    advanced when a worker frees up, so parsing, splitting and embedding overlap
+    without the whole document ever being held in memory.
+
+    Args:
+        chunks (iterable): The chunks to ingest, e.g. from iter_pdf_chunks().
+        db: The vector store to write into.
+        id_prefix (str): Prefix for the chunk ids, usually the document hash.
+        stats (IngestStats, optional): Counters to update; a new record is created if omitted.
+        batch_size (int): The number of chunks embedded per request.
+        max_workers (int): The number of batches embedded concurrently.
+        on_progress (callable, optional): Called with the stats after each completed batch.
+        **retry_options: Passed to add_batch_with_retry().
+
+    Returns:
+        IngestStats: The final counters for the run.
+    """
+    stats = stats if stats is not None else IngestStats()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+
+        def collect(done):
+            for future in done:
+                # The counters are only updated here, on the calling thread, so workers never race on them.
+                written, retries = future.result() # Re-raises a batch that ran out of retries.
+                stats.chunks += written
+                stats.retries += retries
+                stats.batches += 1
+                if on_progress is not None:
+                    on_progress(stats)
+
+        for batch in iter_batches(chunks, batch_size):
+            if len(in_flight) >= max_workers:
+                # Backpressure: wait for a worker before pulling more chunks from the parser.
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(executor.submit(add_batch_with_retry, db, batch, id_prefix, **retry_options))
+        collect(wait(in_flight).done)
+
+    stats.finished_at = time.perf_counter()
+    return stats
@@ -1,67 +1,291 @@
 import streamlit as st # Import the Streamlit library for creating web applications.
 from langchain.text_splitter import RecursiveCharacterTextSplitter # For splitting documents into manageable chunks.
-from langchain.embeddings import CohereEmbeddings # For converting text into numerical vector embeddings using Cohere.
 from langchain.vectorstores import Chroma # For storing and querying vector embeddings (a vector database).
-from langchain_cohere import ChatCohere # For interacting with Cohere's large language models.
 from langchain.prompts import PromptTemplate # For defining structured prompts for the LLM.
-from langchain.document_loaders import PyPDFLoader # For loading PDF documents.
+import hashlib # For hashing uploaded PDFs into stable, content-addressed cache keys.
+import json # For reading and writing the vector store manifest file.
 import os # For interacting with the operating system, e.g., creating directories and managing file paths.
+import shutil # For removing half-built vector stores left behind by an interrupted build.
 from dotenv import load_dotenv # For loading environment variables from a .env file.
+from common.clients import get_cohere_chat, get_cohere_embeddings # For shared, connection-pooled Cohere clients.
+from common.llm_callbacks import get_metrics_handler # For recording LLM call latency and tokens.
+from common.metrics import metrics # For timing embedding and retrieval calls.
+from knowledge_based_chatbot.answer_cache import SemanticAnswerCache, replay_answer # For reusing answers to paraphrased queries.
+from knowledge_based_chatbot.bm25_index import BM25Index, reciprocal_rank_fusion # For lexical search fused with vector search.
+from knowledge_based_chatbot.context_builder import build_context, estimate_tokens # For packing retrieved chunks into a token budget.
+from knowledge_based_chatbot.corpus import Corpus # For the multi-document library mode.
+from knowledge_based_chatbot.ingestion import IngestStats, chunk_id, ingest_chunks, iter_pdf_chunks, iter_pdf_chunks_parallel # For streaming PDFs into the vector store.
+from knowledge_based_chatbot.vector_index import MmapVectorIndex, MmapVectorIndexWriter # For the memory-mapped retrieval backend.
 
 # Load environment variables from the .env file.
 # This is essential for securely accessing API keys without hardcoding them.
 load_dotenv()
 COHERE_API_KEY = os.getenv("COHERE_API_KEY") # Retrieve the Cohere API key from environment variables.
 
-# Decorator to cache the data. This ensures that the PDF loading and splitting
-# process runs only once per unique PDF upload, improving performance.
-# 'show_spinner' provides user feedback during this potentially long operation.
-# 'max_entries' limits the cache size to prevent excessive memory usage.
-@st.cache_data(show_spinner="Splitting PDF…", max_entries=10)
-def load_and_split(path):
+APP_NAME = "knowledge_based_chatbot"
+
+# Splitter and embedding settings. These are part of the document hash, so changing
+# any of them automatically invalidates previously persisted vector stores.
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+EMBEDDING_MODEL = "embed-english-light-v3.0"
+
+# Ingestion settings: chunks embedded per request and the number of requests in flight.
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Number of processes used to parse and split PDFs; 1 parses in the Streamlit process.
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Directory under which one persisted vector store is kept per document hash and backend.
+VECTORSTORE_DIR = os.getenv("VECTORSTORE_DIR", os.path.join("data", "vectorstores"))
+# Retrieval backend: "chroma" for a Chroma collection, "mmap" for the memory-mapped NumPy index.
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma")
+RETRIEVER_BACKENDS = ("chroma", "mmap")
+# Written last when a store is built; a store directory without it is incomplete.
+MANIFEST_FILE = "manifest.json"
+# BM25 inverted index, stored in the document directory next to the vector store backends.
+BM25_FILE = "bm25.json"
+# Directory holding the shared multi-document collection and its registry.
+CORPUS_DIR = os.getenv("CORPUS_DIR", os.path.join("data", "corpus"))
+
+# Hybrid retrieval: candidates fetched from each retriever before reciprocal rank fusion,
+# and the number of fused chunks considered when packing the context.
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "12"))
+# Context packing: approximate prompt tokens available for context, and the MMR
+# trade-off between relevance (1.0) and diversity (0.0).
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# Semantic answer cache: minimum cosine similarity for a hit, capacity and entry lifetime.
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+def compute_doc_hash(pdf_bytes):
     """
-    Loads a PDF document from a given path and splits it into smaller,
-    manageable text chunks (documents).
+    Computes a content-addressed key for an uploaded PDF.
+
+    The key covers the raw PDF bytes together with the splitter settings and the
+    embedding model, since all three determine the vectors stored for the document.
 
     Args:
-        path (str): The file path to the PDF document.
+        pdf_bytes (bytes): The raw content of the uploaded PDF.
 
     Returns:
-        list: A list of LangChain Document objects, each representing a text chunk.
+        str: A hex-encoded SHA-256 digest.
+    """
+    hasher = hashlib.sha256(pdf_bytes)
+    settings = {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "embedding_model": EMBEDDING_MODEL}
+    hasher.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return hasher.hexdigest()
+
+def get_store_path(doc_hash, backend=RETRIEVER_BACKEND):
+    """
+    Returns the directory holding the persisted vector store for a document hash and backend.
+    """
+    return os.path.join(VECTORSTORE_DIR, doc_hash, backend)
+
+def is_store_persisted(doc_hash, backend=RETRIEVER_BACKEND):
+    """
+    Checks whether a complete vector store already exists on disk for a document hash.
+    """
+    return os.path.exists(os.path.join(get_store_path(doc_hash, backend), MANIFEST_FILE))
+
+def get_bm25_path(doc_hash):
+    """
+    Returns the path of the persisted BM25 index for a document hash.
+    """
+    return os.path.join(VECTORSTORE_DIR, doc_hash, BM25_FILE)
+
+def iter_pdf_chunks_for(pdf_path, stats=None):
+    """
+    Yields the chunks of a PDF, parsing in worker processes when PARSE_WORKERS > 1.
+    """
+    if PARSE_WORKERS > 1:
+        # Parsing and splitting are CPU-bound, so fan page ranges out to worker processes.
+        return iter_pdf_chunks_parallel(pdf_path, CHUNK_SIZE, CHUNK_OVERLAP, stats, max_workers=PARSE_WORKERS)
+    return iter_pdf_chunks(pdf_path, get_splitter(), stats)
+
+def index_chunks(chunks, bm25, id_prefix):
+    """
+    Adds each chunk to the BM25 index as it streams past on its way to the vector store.
+    """
+    for chunk in chunks:
+        bm25.add(chunk_id(id_prefix, chunk), chunk.page_content, chunk.metadata)
+        yield chunk
+
+def get_splitter():
+    """
+    Returns the text splitter used to break PDF pages into chunks.
     """
-    loader = PyPDFLoader(path) # Initialize a PDF loader with the document path.
-    docs = loader.load() # Load the entire PDF content as a list of documents (usually one per page).
-    # Initialize a text splitter to break down large documents.
     # 'chunk_size' defines the maximum size of each chunk.
     # 'chunk_overlap' defines how much overlap there should be between consecutive chunks,
     # helping to maintain context across splits.
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    return splitter.split_documents(docs) # Split the loaded documents into smaller chunks.
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
 
-# Decorator to cache the resource. This ensures the vector store is built
-# and initialized only once per set of unique documents, saving computation.
-@st.cache_resource(show_spinner="Building vectorstore…")
-def get_vectorstore(_docs):
+# Decorator to cache the resource. The embeddings client is stateless and
+# shared by every vector store, so it is created only once per process.
+@st.cache_resource
+def get_embeddings():
     """
-    Creates and returns a Chroma vector store from a list of documents.
-    The documents are converted into embeddings using Cohere's embedding model.
-
-    Args:
-        _docs (list): A list of LangChain Document objects (text chunks).
+    Returns the shared Cohere embeddings client used to build and query vector stores.
 
     Returns:
-        Chroma: An initialized Chroma vector store.
+        CohereEmbeddings: The embeddings client.
     """
     # Initialize Cohere Embeddings model.
     # 'model' specifies the embedding model to use.
     # 'user_agent' is a custom identifier for API requests, useful for tracking.
-    embeddings = CohereEmbeddings(
-        model="embed-english-light-v3.0",
+    return get_cohere_embeddings(
+        model=EMBEDDING_MODEL,
         user_agent="streamlit-rag-app"
     )
-    # Create a Chroma vector store from the documents and the embeddings model.
-    # This process embeds the text chunks and stores them in the vector database.
-    return Chroma.from_documents(_docs, embeddings)
+
+def open_store(doc_hash, backend, embeddings):
+    """
+    Opens the persisted vector store for a document hash with the given backend.
+
+    Both backends answer similarity_search(query, k) with LangChain Documents, so
+    callers do not need to know which one is in use.
+    """
+    store_path = get_store_path(doc_hash, backend)
+    if backend == "mmap":
+        return MmapVectorIndex(store_path, embeddings)
+    return Chroma(
+        collection_name=f"pdf-{doc_hash[:16]}", # Chroma limits collection names to 63 characters.
+        embedding_function=embeddings,
+        persist_directory=store_path
+    )
+
+# Decorator to cache the resource. 'doc_hash' and 'backend' are the cache key, so each
+# unique PDF gets its own vector store while the PDF path is excluded from the key.
+@st.cache_resource(show_spinner="Loading vectorstore…", max_entries=10)
+def get_vectorstore(doc_hash, _pdf_path, backend=RETRIEVER_BACKEND):
+    """
+    Returns the vector store for a document, building it only if needed.
+
+    The store is persisted under VECTORSTORE_DIR in a directory named after the
+    document hash and backend. Re-uploads and process restarts therefore open the
+    existing store from disk instead of embedding the document again.
+
+    Args:
+        doc_hash (str): The content hash of the PDF, see compute_doc_hash().
+        _pdf_path (str): The file path to the PDF document, used only when the store has to be built.
+        backend (str): One of RETRIEVER_BACKENDS.
+
+    Returns:
+        Chroma | MmapVectorIndex: An initialized vector store.
+    """
+    if backend not in RETRIEVER_BACKENDS:
+        raise ValueError(f"Unknown retriever backend {backend!r}, expected one of {RETRIEVER_BACKENDS}")
+
+    store_path = get_store_path(doc_hash, backend)
+    embeddings = get_embeddings()
+
+    if is_store_persisted(doc_hash, backend):
+        # The document was embedded before: open the persisted store directly.
+        return open_store(doc_hash, backend, embeddings)
+
+    # Remove any partially written store left behind by an interrupted build.
+    shutil.rmtree(store_path, ignore_errors=True)
+    os.makedirs(store_path, exist_ok=True)
+
+    # Stream the PDF into the store batch by batch. Pages are parsed lazily and
+    # split as they arrive, and batches are embedded concurrently, so large PDFs
+    # start writing to the store right away. The mmap backend collects the
+    # vectors and writes its matrix once ingestion has finished.
+    if backend == "mmap":
+        db = MmapVectorIndexWriter(store_path, embeddings)
+    else:
+        db = open_store(doc_hash, backend, embeddings)
+    status = st.empty()
+
+    def report(stats):
+        status.caption(
+            f"Embedded {stats.chunks} chunks from {stats.pages} pages "
+            f"({stats.pages_per_sec:.1f} pages/s, {stats.chunks_per_sec:.1f} chunks/s)"
+        )
+
+    stats = IngestStats()
+    # The BM25 index is built from the same chunk stream, so the PDF is only parsed once.
+    bm25 = BM25Index()
+    ingest_chunks(
+        index_chunks(iter_pdf_chunks_for(_pdf_path, stats), bm25, doc_hash[:16]),
+        db,
+        id_prefix=doc_hash[:16],
+        stats=stats,
+        batch_size=INGEST_BATCH_SIZE,
+        max_workers=INGEST_WORKERS,
+        on_progress=report
+    )
+    report(stats)
+    bm25.save(get_bm25_path(doc_hash))
+    if backend == "mmap":
+        db.finalize()
+        db = open_store(doc_hash, backend, embeddings)
+
+    # Record the manifest last so that only fully built stores are ever reused.
+    with open(os.path.join(store_path, MANIFEST_FILE), "w") as f:
+        json.dump({
+            "doc_hash": doc_hash,
+            "backend": backend,
+            "chunks": stats.chunks,
+            "pages": stats.pages,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "embedding_model": EMBEDDING_MODEL
+        }, f)
+    return db
+
+# Decorator to cache the resource. 'doc_hash' is the cache key, as for get_vectorstore().
+@st.cache_resource(show_spinner="Loading keyword index…", max_entries=10)
+def get_bm25_index(doc_hash, _pdf_path):
+    """
+    Returns the BM25 index for a document.
+
+    The index is normally written by get_vectorstore() during ingestion. Stores
+    built before keyword search existed get their index rebuilt from the PDF,
+    which only parses and splits it and makes no embedding calls.
+
+    Args:
+        doc_hash (str): The content hash of the PDF, see compute_doc_hash().
+        _pdf_path (str): The file path to the PDF document, used only when the index has to be built.
+
+    Returns:
+        BM25Index: The loaded or rebuilt index.
+    """
+    path = get_bm25_path(doc_hash)
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    bm25 = BM25Index()
+    for _ in index_chunks(iter_pdf_chunks_for(_pdf_path), bm25, doc_hash[:16]):
+        pass
+    bm25.save(path)
+    return bm25
+
+def hybrid_search(db, bm25, query, query_embedding, id_prefix, k=CONTEXT_CANDIDATES, candidates=HYBRID_CANDIDATES):
+    """
+    Retrieves context chunks by fusing dense vector search with BM25 keyword search.
+
+    Dense search finds paraphrases while BM25 finds exact identifiers, part numbers
+    and error codes; reciprocal rank fusion combines both rankings by chunk id.
+
+    Args:
+        db: The vector store for the document.
+        bm25 (BM25Index): The keyword index for the document.
+        query (str): The user's query.
+        query_embedding (list): The embedding of the query.
+        id_prefix (str): The chunk id prefix used at ingest time.
+        k (int): The number of chunks to return.
+        candidates (int): The number of chunks fetched from each retriever.
+
+    Returns:
+        list: (Document, fused score) pairs, best first.
+    """
+    dense = db.similarity_search_by_vector(query_embedding, k=candidates)
+    lexical = [doc for doc, _ in bm25.search(query, k=candidates)]
+    return reciprocal_rank_fusion([dense, lexical], key=lambda doc: chunk_id(id_prefix, doc), limit=k, with_scores=True)
 
 # Decorator to cache the resource. This ensures the LLM and prompt chain
 # are initialized only once, improving efficiency.
@@ -78,7 +302,7 @@ def get_chain():
     # 'model' specifies the LLM to use.
     # 'temperature' controls the randomness of the output (0.1 means less creative, more factual).
     # 'streaming=True' enables streaming responses, which is good for user experience in web apps.
-    llm = ChatCohere(model="command-r-plus", temperature=0.1, streaming=True)
+    llm = get_cohere_chat(model="command-r-plus", temperature=0.1, streaming=True)
     # Define the prompt template for RAG.
     # It explicitly includes placeholders for 'context' (retrieved from the vector store)
     # and 'query' (user's question).
@@ -90,19 +314,41 @@ def get_chain():
     """)
     # Create the chain by piping the prompt to the LLM.
     # This means the prompt will be formatted with context and query, then sent to the LLM.
-    return prompt | llm
+    # Every call through the chain is recorded in the shared metrics under this app's name.
+    return (prompt | llm).with_config(callbacks=[get_metrics_handler(APP_NAME)])
 
-def run():
+# Decorator to cache the resource. One answer cache is shared by every session in the process.
+@st.cache_resource
+def get_answer_cache():
     """
-    Main function to run the Streamlit PDF Knowledge Base application.
-    Handles PDF uploading, processing, query input, and displaying answers.
+    Returns the process-wide semantic answer cache.
     """
-    st.title("📚 PDF Knowledge Base") # Set the title of the Streamlit app.
+    return SemanticAnswerCache(
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds=ANSWER_CACHE_TTL
+    )
 
-    uploaded = st.file_uploader("Upload PDF:", type="pdf") # Create a file uploader widget for PDFs.
-    if not uploaded:
-        return # If no PDF is uploaded, stop execution.
+def collect_stream(stream, parts):
+    """
+    Passes the text of each streamed message chunk through while collecting it in 'parts'.
+    """
+    for chunk in stream:
+        parts.append(chunk.content)
+        yield chunk.content
 
+# Decorator to cache the resource. One corpus handle is shared by every session in the process.
+@st.cache_resource(show_spinner="Opening document library…")
+def get_corpus():
+    """
+    Returns the persistent multi-document corpus.
+    """
+    return Corpus(CORPUS_DIR, get_embeddings(), get_bm25_path)
+
+def save_upload(uploaded):
+    """
+    Saves an uploaded PDF to the 'temp' directory and returns its path and content hash.
+    """
     # Define a temporary directory to save the uploaded PDF.
     pdf_path = os.path.join("temp", uploaded.name)
     os.makedirs("temp", exist_ok=True) # Create the 'temp' directory if it doesn't exist.
@@ -111,25 +357,172 @@ def run():
     with open(pdf_path, "wb") as f:
         f.write(uploaded.getbuffer())
 
-    # Load and split the PDF into documents (chunks). This function is cached.
-    docs = load_and_split(pdf_path)
-    # Get or build the vector store from the document chunks. This function is cached.
-    db = get_vectorstore(docs)
-    # Get or initialize the LLM chain. This function is cached.
+    # Hash the PDF content so identical uploads share one persisted vector store.
+    return pdf_path, compute_doc_hash(uploaded.getvalue())
+
+def answer_query(query, cache_key, retrieve):
+    """
+    Answers a query from the semantic cache or by retrieval and generation, streaming the result.
+
+    Args:
+        query (str): The user's query.
+        cache_key (str): Identifies what is being searched (a document or a corpus selection)
+            so cached answers are only reused for the same source.
+        retrieve (callable): Called with (query, query_embedding); returns (Document, score) candidates.
+    """
+    # Get or initialize the LLM chain and the shared semantic answer cache. These functions are cached.
     chain = get_chain()
+    answer_cache = get_answer_cache()
+
+    with st.spinner("Searching…"): # Show a spinner while searching.
+        # Embed the query once; the embedding is used for both the cache lookup and the search.
+        with metrics.timed(APP_NAME, EMBEDDING_MODEL, "embed"):
+            query_embedding = get_embeddings().embed_query(query)
+        cached = answer_cache.lookup(cache_key, query_embedding)
+        if cached is not None:
+            # A sufficiently similar question was already answered for this source: replay it.
+            st.write_stream(replay_answer(cached.answer))
+            st.caption(f"Answer reused from a similar question: \"{cached.query}\"")
+            return
+
+        # Over-fetch candidates, then pack the most relevant, least redundant ones into the
+        # token budget, merging chunks that are consecutive on the same page.
+        with metrics.timed(APP_NAME, "hybrid", "retrieve"):
+            candidates = retrieve(query, query_embedding)
+        context_text, context_docs = build_context(
+            candidates,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            max_overlap=CHUNK_OVERLAP,
+            lambda_mult=MMR_LAMBDA
+        )
+        # Stream the LLM's response to the Streamlit app while collecting it for the cache.
+        # The chain takes the user's query and the retrieved context to generate an answer.
+        parts = []
+        st.write_stream(collect_stream(chain.stream({"query": query, "context": context_text}), parts))
+        answer_cache.store(
+            cache_key,
+            query,
+            query_embedding,
+            [chunk_id(d.metadata.get("doc_id", cache_key[:16]), d) for d in context_docs],
+            "".join(parts)
+        )
+    st.caption(f"Context: {len(context_docs)} chunks, ~{estimate_tokens(context_text)} tokens")
+
+def show_cache_stats():
+    stats = get_answer_cache().stats()
+    st.caption(
+        f"Answer cache: {stats['hits']} hits / {stats['misses']} misses "
+        f"({stats['hit_ratio']:.0%} hit ratio, {stats['entries']} entries)"
+    )
+
+def run_single_document():
+    """
+    Single PDF mode: upload one PDF and ask questions about it.
+    """
+    uploaded = st.file_uploader("Upload PDF:", type="pdf") # Create a file uploader widget for PDFs.
+    if not uploaded:
+        return # If no PDF is uploaded, stop execution.
+
+    pdf_path, doc_hash = save_upload(uploaded)
+    # Load the persisted vector store, or split and embed the PDF if it is new. This function is cached.
+    db = get_vectorstore(doc_hash, pdf_path)
+    # Load the keyword index written next to the vector store. This function is cached.
+    bm25 = get_bm25_index(doc_hash, pdf_path)
 
     query = st.text_input("Enter your query:") # Create a text input for the user's query.
     if st.button("Search"): # Create a button to trigger the search.
-        with st.spinner("Searching…"): # Show a spinner while searching.
-            # Perform a similarity search in the vector store to find relevant context documents.
-            # 'k=3' means retrieve the top 3 most similar document chunks.
-            context_docs = db.similarity_search(query, k=3)
-            # Join the content of the retrieved documents into a single string to serve as context for the LLM.
-            context_text = "\n\n".join([d.page_content for d in context_docs])
-            # Stream the LLM's response to the Streamlit app.
-            # The chain takes the user's query and the retrieved context to generate an answer.
-            st.write_stream(chain.stream({"query": query, "context": context_text}))
+        # Retrieve candidate chunks by fusing vector and keyword search results.
+        answer_query(
+            query,
+            doc_hash,
+            lambda query, query_embedding: hybrid_search(db, bm25, query, query_embedding, doc_hash[:16])
+        )
+    show_cache_stats()
+
+def run_corpus():
+    """
+    Document library mode: add and remove PDFs one at a time and query across all or some of them.
+    """
+    corpus = get_corpus()
+
+    uploads = st.file_uploader("Add PDFs to the library:", type="pdf", accept_multiple_files=True)
+    if uploads and st.button("Add to library"):
+        for uploaded in uploads:
+            pdf_path, doc_hash = save_upload(uploaded)
+            status = st.empty()
+
+            def report(stats, name=uploaded.name):
+                status.caption(
+                    f"{name}: embedded {stats.chunks} chunks from {stats.pages} pages "
+                    f"({stats.pages_per_sec:.1f} pages/s, {stats.chunks_per_sec:.1f} chunks/s)"
+                )
+
+            # Only the new document's chunks are embedded; documents already in the library are skipped.
+            stats = IngestStats()
+            added = corpus.add_document(
+                doc_hash,
+                uploaded.name,
+                iter_pdf_chunks_for(pdf_path, stats),
+                stats=stats,
+                batch_size=INGEST_BATCH_SIZE,
+                max_workers=INGEST_WORKERS,
+                on_progress=report
+            )
+            if not added:
+                status.caption(f"{uploaded.name} is already in the library.")
+
+    if not corpus.documents:
+        st.info("The library is empty. Add PDFs above to start asking questions.")
+        return
+
+    # Per-document chunk counts with a remove button for each document.
+    st.subheader("Library")
+    total_chunks = sum(doc["chunks"] for doc in corpus.documents.values())
+    st.caption(
+        f"{len(corpus.documents)} documents, {total_chunks} chunks, "
+        f"{corpus.index_size() / 2 ** 20:.1f} MB on disk"
+    )
+    for doc_id, doc in list(corpus.documents.items()):
+        name_col, count_col, remove_col = st.columns([4, 2, 1])
+        name_col.write(doc["name"])
+        count_col.write(f"{doc['chunks']} chunks, {doc['pages']} pages")
+        if remove_col.button("Remove", key=f"remove_{doc_id}"):
+            corpus.remove_document(doc_id)
+            st.rerun()
+
+    selected = st.multiselect(
+        "Search in (all documents if empty):",
+        options=list(corpus.documents),
+        format_func=lambda doc_id: corpus.documents[doc_id]["name"]
+    )
+    query = st.text_input("Enter your query:")
+    if st.button("Search"):
+        doc_ids = sorted(selected or corpus.documents)
+        # Cached answers are only reused for exactly the same document selection.
+        cache_key = "corpus-" + hashlib.sha256(",".join(doc_ids).encode("utf-8")).hexdigest()
+        answer_query(
+            query,
+            cache_key,
+            lambda query, query_embedding: corpus.hybrid_search(
+                query, query_embedding, doc_ids, k=CONTEXT_CANDIDATES, candidates=HYBRID_CANDIDATES
+            )
+        )
+    show_cache_stats()
+
+def run():
+    """
+    Main function to run the Streamlit PDF Knowledge Base application.
+    Handles PDF uploading, processing, query input, and displaying answers.
+    """
+    st.title("📚 PDF Knowledge Base") # Set the title of the Streamlit app.
+
+    # Single PDF mode keeps one store per document; library mode shares one collection across documents.
+    mode = st.radio("Mode:", ["Single PDF", "Document library"], horizontal=True)
+    if mode == "Single PDF":
+        run_single_document()
+    else:
+        run_corpus()
 
 # Entry point of the script.
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,141 @@
+import json # For serializing chunk text and metadata.
+import mmap # For sharing the chunk file between processes without copying it.
+import os # For building file paths and atomically replacing files.
+import threading # For guarding the writer against concurrent ingestion batches.
+import numpy as np # For the embedding matrix and vectorized scoring.
+from langchain.schema import Document # For returning search results in the same shape as Chroma.
+
+EMBEDDINGS_FILE = "embeddings.npy" # (n, dim) float32 matrix of L2-normalized embeddings.
+OFFSETS_FILE = "offsets.npy" # (n + 1,) int64 byte offsets of each row in CHUNKS_FILE.
+CHUNKS_FILE = "chunks.jsonl" # One JSON object per row: id, text and metadata.
+
+def normalize(vectors):
+    """
+    L2-normalizes a vector or the rows of a matrix as float32, so a dot product is a cosine similarity.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _atomic_save(path, array):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+class MmapVectorIndexWriter:
+    """
+    Collects embedded chunks and writes them out as a memory-mappable index.
+
+    It exposes the same add_texts() method as a LangChain vector store, so it can
+    be handed to ingest_chunks() in place of Chroma.
+    """
+
+    def __init__(self, path, embedding_function):
+        self.path = path
+        self.embedding_function = embedding_function
+        self._vectors = []
+        self._rows = []
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(len(self._rows) + i) for i in range(len(texts))]
+        # Embed outside the lock so concurrent batches overlap their API calls.
+        vectors = self.embedding_function.embed_documents(texts)
+        with self._lock:
+            self._vectors.extend(vectors)
+            self._rows.extend({"id": i, "text": t, "metadata": m} for i, t, m in zip(ids, texts, metadatas))
+        return ids
+
+    def finalize(self):
+        """
+        Writes the embedding matrix, the chunk file and the row offsets to disk.
+
+        Returns:
+            int: The number of rows written.
+        """
+        with self._lock:
+            matrix = normalize(self._vectors) if self._vectors else np.zeros((0, 0), dtype=np.float32)
+            offsets = [0]
+            chunks_path = os.path.join(self.path, CHUNKS_FILE)
+            with open(chunks_path + ".tmp", "wb") as f:
+                for row in self._rows:
+                    line = (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    offsets.append(offsets[-1] + len(line))
+            os.replace(chunks_path + ".tmp", chunks_path)
+            _atomic_save(os.path.join(self.path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+            _atomic_save(os.path.join(self.path, EMBEDDINGS_FILE), matrix)
+            return len(self._rows)
+
+class MmapVectorIndex:
+    """
+    A read-only vector index backed by memory-mapped NumPy arrays.
+
+    The embedding matrix and chunk file are mapped rather than read, so opening
+    the index is nearly free and every process serving the same document shares
+    one copy of it through the OS page cache. A query is scored with a single
+    matrix-vector product and the top k rows are picked with argpartition.
+    """
+
+    def __init__(self, path, embedding_function):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.matrix = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._chunks_file = open(os.path.join(path, CHUNKS_FILE), "rb")
+        # mmap cannot map an empty file, so an empty index keeps no mapping.
+        self._chunks = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ) if len(self) else None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get_row(self, row):
+        """
+        Returns the stored {'id', 'text', 'metadata'} record for a row.
+        """
+        return json.loads(self._chunks[self.offsets[row]:self.offsets[row + 1]])
+
+    def search_by_vector(self, vector, k=4):
+        """
+        Returns the top-k (row, score) pairs for an embedding, best first.
+        """
+        if not len(self) or k <= 0:
+            return []
+        scores = self.matrix @ normalize(vector)
+        k = min(k, len(scores))
+        # argpartition finds the k best rows in linear time; only those k are sorted.
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        """
+        Returns the top-k Documents for an already computed query embedding with their cosine similarity.
+        """
+        results = []
+        for row, score in self.search_by_vector(embedding, k):
+            record = self.get_row(row)
+            results.append((Document(page_content=record["text"], metadata=record["metadata"]), score))
+        return results
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        """
+        Returns the top-k Documents for an already computed query embedding, matching Chroma.
+        """
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4):
+        """
+        Returns the top-k Documents for a query together with their cosine similarity.
+        """
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query, k=4):
+        """
+        Returns the top-k Documents for a query, matching Chroma's similarity_search().
+        """
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
@@ -0,0 +1,32 @@
+from code_to_comment_readme_summary.langgraph_components.code_chunks import public_surface, surface_key
+from common.response_cache import ResponseCache
+
+MODEL = "command-r-plus"
+VERSION = "readme-v1"
+
+def test_scripts_with_the_same_surface_do_not_share_an_entry(tmp_path):
+    first = "import streamlit as st\nst.title('Jokes')\nst.button('Tell me one')\n"
+    second = "import streamlit as st\nst.title('Stories')\nst.text_input('Opening sentence')\n"
+    assert public_surface(first) == public_surface(second)
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.set(surface_key(MODEL, first, "jokes.py", VERSION), "# Jokes")
+    assert cache.get(surface_key(MODEL, second, "stories.py", VERSION)) is None
+    assert cache.get(surface_key(MODEL, second, "jokes.py", VERSION)) is None
+
+def test_modules_with_the_same_surface_do_not_share_an_entry(tmp_path):
+    first = "import os\n\ndef run(x):\n    return os.path.basename(x)\n"
+    second = "import os\n\ndef run(x):\n    return os.remove(x)\n"
+    assert public_surface(first) == public_surface(second)
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.set(surface_key(MODEL, first, "paths.py", VERSION), "# Paths")
+    assert cache.get(surface_key(MODEL, second, "cleanup.py", VERSION)) is None
+
+def test_body_edits_in_the_same_module_reuse_the_entry(tmp_path):
+    before = "import os\n\ndef run(x):\n    return os.path.basename(x)\n"
+    after = "import os\n\ndef run(x):\n    # Strip the directory.\n    return os.path.split(x)[1]\n"
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"))
+    cache.set(surface_key(MODEL, before, "paths.py", VERSION), "# Paths")
+    assert cache.get(surface_key(MODEL, after, "paths.py", VERSION)) == "# Paths"
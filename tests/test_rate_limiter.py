@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+import pytest
+from common import rate_limiter
+from common.rate_limiter import SharedRateLimiter
+
+CHARGED = 1500
+
+@pytest.fixture
+def limiter(tmp_path, monkeypatch):
+    # A frozen clock, so the buckets do not refill between the calls under test.
+    monkeypatch.setattr(rate_limiter.time, "time", lambda: 1000.0)
+    return SharedRateLimiter("test", requests_per_minute=60, tokens_per_minute=10000, path=str(tmp_path / "limiter.sqlite3"))
+
+def tokens_level(limiter):
+    return limiter.stats()["levels"]["tokens"]
+
+def test_adjust_debits_usage_above_the_charge(limiter):
+    limiter.acquire(CHARGED)
+    assert tokens_level(limiter) == 10000 - CHARGED
+    limiter.adjust(4000 - CHARGED)
+    assert tokens_level(limiter) == 10000 - 4000
+
+def test_adjust_refunds_unused_budget(limiter):
+    limiter.acquire(CHARGED)
+    limiter.adjust(200 - CHARGED)
+    assert tokens_level(limiter) == 10000 - 200
+
+def test_adjust_can_overdraw_the_bucket(limiter):
+    limiter.acquire(CHARGED)
+    limiter.adjust(12000 - CHARGED)
+    assert tokens_level(limiter) == 10000 - 12000
+
+def test_reconciler_settles_the_reported_usage(limiter, monkeypatch):
+    pytest.importorskip("langchain_core")
+    monkeypatch.setattr(rate_limiter, "get_shared_limiter", lambda provider: limiter)
+    monkeypatch.setattr(rate_limiter, "_reconcilers", {})
+    reconciler = rate_limiter.get_token_reconciler("test", tokens=CHARGED)
+    message = SimpleNamespace(usage_metadata={"input_tokens": 3000, "output_tokens": 500})
+    response = SimpleNamespace(generations=[[SimpleNamespace(message=message)]], llm_output=None)
+
+    limiter.acquire(CHARGED)
+    reconciler.on_llm_end(response)
+    assert tokens_level(limiter) == 10000 - 3500
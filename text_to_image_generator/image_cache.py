@@ -0,0 +1,145 @@
+import hashlib # For content-addressed file names.
+import json # For serializing key parts deterministically.
+import os # For the cache directory and file sizes.
+import re # For normalizing prompts.
+import threading # For sharing one cache between Streamlit sessions.
+
+# Default location and size bound of the on-disk image cache.
+DEFAULT_IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join("data", "image_cache"))
+DEFAULT_IMAGE_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+def normalize_prompt(prompt):
+    """
+    Collapses runs of whitespace and trims the prompt, so trivially different spellings share a cache entry.
+    """
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def make_image_key(prompt, endpoint, **params):
+    """
+    Builds a cache key from the normalized prompt, the API endpoint and any other request parameters.
+
+    Returns:
+        str: A hex-encoded SHA-256 digest.
+    """
+    parts = {"prompt": normalize_prompt(prompt), "endpoint": endpoint, **params}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ImageCache:
+    """
+    A disk-backed, size-bounded LRU cache of generated images.
+
+    Each entry is the raw PNG returned by the API, stored as '<key>.png'. The
+    bytes are served as-is (st.image accepts encoded bytes), so a hit never
+    decodes the image. A file's modification time records its last use, and the
+    least recently used files are deleted once the directory exceeds 'max_bytes'.
+    """
+
+    def __init__(self, directory=DEFAULT_IMAGE_CACHE_DIR, max_bytes=DEFAULT_IMAGE_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def peek(self, key):
+        """
+        Returns the cached PNG bytes for a key, or None, without counting a hit or a miss.
+
+        For internal reads of images that were already generated, such as rebuilding
+        their variants, so the hit ratio only reflects generation requests.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path) # Marks the entry as recently used.
+        except FileNotFoundError: # Missing, or evicted by another session in the meantime.
+            return None
+        return data
+
+    def get(self, key):
+        """
+        Returns the cached PNG bytes for a key, or None if there is no entry.
+        """
+        data = self.peek(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        """
+        Stores PNG bytes for a key, then evicts the least recently used entries beyond the size bound.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path) # Atomic, so readers never see a partially written image.
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".png"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def get_or_call(self, key, call, enabled=True):
+        """
+        Returns the cached bytes for a key, or calls 'call()' and caches the bytes it returns.
+
+        Args:
+            key (str): The cache key, see make_image_key().
+            call (callable): Produces the PNG bytes on a miss.
+            enabled (bool): False bypasses the cache, e.g. to get a fresh image for the same prompt.
+
+        Returns:
+            tuple: (PNG bytes, whether they came from the cache).
+        """
+        if enabled:
+            data = self.get(key)
+            if data is not None:
+                return data, True
+        data = call()
+        self.set(key, data)
+        return data, False
+
+    def stats(self):
+        """
+        Returns hit/miss/eviction counters and the current size of the cache on disk.
+        """
+        entries = self._entries()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries)
+            }
@@ -0,0 +1,167 @@
+import io # For encoding images in memory.
+import os # For reading the variant settings from the environment.
+import threading # For sharing the store between Streamlit sessions.
+from collections import OrderedDict # For the LRU memory budget.
+from concurrent.futures import ThreadPoolExecutor # For post-processing off the request path.
+
+# Variant settings: the longest side of a thumbnail, the lossy quality, and the in-memory budget.
+THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256"))
+VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+VARIANT_MEMORY_BYTES = int(os.getenv("IMAGE_VARIANT_MEMORY_MB", "64")) * 1024 * 1024
+VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+
+def variant_format():
+    """
+    Returns the format used for variants: WebP when Pillow was built with it, JPEG otherwise.
+    """
+    from PIL import features # Imported lazily so opening the app does not pay for Pillow.
+    return "WEBP" if features.check("webp") else "JPEG"
+
+def encode_variants(png, thumbnail_size=THUMBNAIL_SIZE, quality=VARIANT_QUALITY):
+    """
+    Decodes a PNG once and returns its compressed variants.
+
+    Args:
+        png (bytes): The original image.
+        thumbnail_size (int): The longest side of the thumbnail, in pixels.
+        quality (int): The WebP/JPEG quality (0-100).
+
+    Returns:
+        dict: {"thumbnail": bytes, "full": bytes}, both encoded with variant_format().
+    """
+    from PIL import Image
+    fmt = variant_format()
+    variants = {}
+    with Image.open(io.BytesIO(png)) as image:
+        image = image.convert("RGB") # JPEG has no alpha channel; WebP is smaller without one.
+        for name, size in (("full", None), ("thumbnail", thumbnail_size)):
+            if size is not None:
+                image.thumbnail((size, size)) # Downscales in place, keeping the aspect ratio.
+            out = io.BytesIO()
+            image.save(out, format=fmt, quality=quality)
+            variants[name] = out.getvalue()
+        image.close() # Release the decoded pixels right away.
+    return variants
+
+class VariantStore:
+    """
+    An in-memory LRU of encoded image variants bounded by a total size in bytes.
+
+    Only compressed bytes are kept; decoded images never outlive encode_variants().
+    When the budget is exceeded the least recently used variants are dropped and
+    regenerated from the on-disk original the next time they are needed.
+    """
+
+    def __init__(self, max_bytes=VARIANT_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict() # (key, variant) -> bytes
+        self._lock = threading.Lock()
+        self.used_bytes = 0
+        self.evictions = 0
+
+    def get(self, key, variant):
+        with self._lock:
+            data = self._items.get((key, variant))
+            if data is not None:
+                self._items.move_to_end((key, variant))
+            return data
+
+    def put(self, key, variants):
+        with self._lock:
+            for variant, data in variants.items():
+                old = self._items.pop((key, variant), None)
+                if old is not None:
+                    self.used_bytes -= len(old)
+                self._items[(key, variant)] = data
+                self.used_bytes += len(data)
+            while self.used_bytes > self.max_bytes and len(self._items) > 1:
+                _, data = self._items.popitem(last=False)
+                self.used_bytes -= len(data)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self.used_bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+class ImageVariantPipeline:
+    """
+    Builds thumbnails and compressed variants of generated images in a thread pool.
+
+    Images are submitted as soon as they are generated, so the variants are
+    usually ready by the time the gallery asks for them. Variants live in a
+    memory-budgeted VariantStore; evicted ones are rebuilt from the original
+    PNG, which 'load_png(key)' reads back (e.g. from the ImageCache).
+    """
+
+    def __init__(self, load_png, max_workers=VARIANT_WORKERS, memory_budget=VARIANT_MEMORY_BYTES,
+                 thumbnail_size=THUMBNAIL_SIZE, quality=VARIANT_QUALITY):
+        self.load_png = load_png
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self.store = VariantStore(memory_budget)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-variants")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._missing = set()
+        self.rebuilt = 0
+        self.format = None # Known once the first variant is built, so stats() never imports Pillow.
+
+    def _build(self, key, png):
+        try:
+            if png is None:
+                png = self.load_png(key)
+            if png is None: # The original was evicted from the disk cache as well.
+                with self._lock:
+                    self._missing.add(key)
+                return None
+            variants = encode_variants(png, self.thumbnail_size, self.quality)
+            if self.format is None:
+                self.format = variant_format()
+            self.store.put(key, variants)
+            return variants
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def submit(self, key, png=None):
+        """
+        Schedules the variants of an image and returns the future, reusing one already scheduled.
+        """
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = self._executor.submit(self._build, key, png)
+            return future
+
+    def get(self, key, variant, wait=False):
+        """
+        Returns the bytes of a variant, or None while it is still being built.
+
+        Evicted variants are rebuilt in the background; pass wait=True to block
+        until they are ready instead, e.g. when the user asked for the full image.
+        """
+        data = self.store.get(key, variant)
+        if data is not None:
+            return data
+        with self._lock:
+            if key in self._missing:
+                return None
+            rebuilding = key not in self._pending
+        future = self.submit(key)
+        if rebuilding:
+            with self._lock:
+                self.rebuilt += 1
+        if not wait:
+            return None
+        variants = future.result()
+        return variants[variant] if variants is not None else None
+
+    def expired(self, key):
+        """
+        Returns True if an image's variants can no longer be built because its original is gone.
+        """
+        with self._lock:
+            return key in self._missing
+
+    def stats(self):
+        return {**self.store.stats(), "pending": len(self._pending), "rebuilt": self.rebuilt, "format": self.format}
@@ -0,0 +1,209 @@
+import itertools # For job ids.
+import random # For backoff jitter.
+import threading # For sharing the queue between Streamlit sessions.
+import time # For backoff delays and job timings.
+from concurrent.futures import ThreadPoolExecutor # For running a bounded number of jobs at once.
+from dataclasses import dataclass # For the job records.
+from email.utils import parsedate_to_datetime # For Retry-After headers given as HTTP dates.
+import requests # For recognising retryable network errors.
+
+QUEUED, RUNNING, RETRYING, DONE, FAILED, CANCELLED = "queued", "running", "retrying", "done", "failed", "cancelled"
+
+# Responses worth retrying: rate limiting and transient server errors.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+@dataclass
+class ImageJob:
+    """
+    One prompt in the queue and everything the UI shows about it.
+    """
+    id: int
+    prompt: str
+    status: str = QUEUED
+    attempts: int = 0
+    image: bytes = None
+    key: str = None
+    cached: bool = False
+    error: str = None
+    submitted_at: float = 0.0
+    started_at: float = None
+    finished_at: float = None
+    retry_at: float = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+def parse_retry_after(value, now=None):
+    """
+    Returns the delay in seconds requested by a Retry-After header (seconds or an HTTP date), or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (now if now is not None else time.time()))
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """
+    Returns how long to wait before retry number 'attempt' (starting at 1).
+
+    Uses exponential backoff with full jitter, so sessions that were rate limited
+    together do not retry together. A Retry-After value from the server is a
+    lower bound; a little jitter is added on top of it for the same reason.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, base))
+    return delay
+
+def is_retryable(error):
+    """
+    Returns the (retryable, Retry-After seconds) pair for an exception raised by a generation call.
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        response = error.response
+        if response.status_code in RETRYABLE_STATUS:
+            return True, parse_retry_after(response.headers.get("Retry-After"))
+        return False, None
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True, None
+    return False, None
+
+def describe_error(error):
+    response = getattr(error, "response", None)
+    if response is not None:
+        return f"API Error {response.status_code}: {response.text}"
+    return f"Error: {error}"
+
+class ImageJobQueue:
+    """
+    Runs image generation jobs in the background with bounded concurrency and retries.
+
+    Prompts are submitted without blocking and run on a small thread pool, so a
+    Streamlit session can queue many prompts and poll their status while the
+    images fill in. Rate limits (429) and transient failures are retried with
+    exponential backoff and jitter, honouring the server's Retry-After header.
+    """
+
+    def __init__(self, generate, max_workers=2, max_retries=4, backoff_base=1.0, backoff_cap=30.0, on_done=None, on_retry=None):
+        """
+        Args:
+            generate (callable): generate(prompt, use_cache) -> (PNG bytes, cached), e.g. a
+                wrapper around generate_clipdrop(). It should raise requests errors on failure.
+            max_workers (int): The maximum number of requests in flight at once.
+            max_retries (int): Retries per job after the first attempt.
+            backoff_base (float): The first backoff step, in seconds.
+            backoff_cap (float): The longest backoff step, in seconds.
+            on_done (callable, optional): Called with each successful job on its worker thread,
+                e.g. to hand the image to post-processing.
+            on_retry (callable, optional): Called with (job, error) before each retry, e.g. for metrics.
+        """
+        self.generate = generate
+        self.on_done = on_done
+        self.on_retry = on_retry
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-job")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._futures = {}
+        self.retries = 0
+        self.rate_limited = 0
+
+    def submit(self, prompt, use_cache=True):
+        """
+        Queues a prompt and returns its job id immediately.
+        """
+        with self._lock:
+            job = ImageJob(id=next(self._ids), prompt=prompt, submitted_at=time.time())
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, use_cache)
+        return job.id
+
+    def _run(self, job, use_cache):
+        job.started_at = time.time()
+        while True:
+            job.status = RUNNING
+            job.attempts += 1
+            try:
+                job.image, job.cached = self.generate(job.prompt, use_cache)
+                if self.on_done is not None:
+                    self.on_done(job)
+                job.status = DONE
+                break
+            except Exception as e:
+                retryable, retry_after = is_retryable(e)
+                if not retryable or job.attempts > self.max_retries:
+                    job.error = describe_error(e)
+                    job.status = FAILED
+                    break
+                delay = backoff_delay(job.attempts, self.backoff_base, self.backoff_cap, retry_after)
+                with self._lock:
+                    self.retries += 1
+                    if getattr(getattr(e, "response", None), "status_code", None) == 429:
+                        self.rate_limited += 1
+                if self.on_retry is not None:
+                    self.on_retry(job, e)
+                job.error = describe_error(e)
+                job.retry_at = time.time() + delay
+                job.status = RETRYING
+                time.sleep(delay)
+        job.retry_at = None
+        job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, job_ids):
+        """
+        Returns the jobs for the given ids, in the same order, skipping unknown ids.
+        """
+        with self._lock:
+            return [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+
+    def cancel(self, job_id):
+        """
+        Cancels a job that has not started yet. Returns True if it was cancelled.
+        """
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None or not future.cancel():
+                return False
+            job = self._jobs[job_id]
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return True
+
+    def forget(self, job_ids):
+        """
+        Drops finished jobs (and their images) from the queue's memory.
+        """
+        with self._lock:
+            for job_id in job_ids:
+                job = self._jobs.get(job_id)
+                if job is not None and job.finished:
+                    del self._jobs[job_id]
+                    self._futures.pop(job_id, None)
+
+    def stats(self):
+        """
+        Returns the number of jobs in each state and the retry counters.
+        """
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {"jobs": counts, "retries": self.retries, "rate_limited": self.rate_limited}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,67 +1,195 @@
 import streamlit as st # Import the Streamlit library for creating web applications.
-import requests, io # Import requests for making HTTP requests and io for handling byte streams.
-from PIL import Image # Import Image from Pillow (PIL) to open and manipulate images.
 from dotenv import load_dotenv # Import load_dotenv to load environment variables from a .env file.
 import os # Import the os module to interact with the operating system, specifically for environment variables.
+import time # Import time to show how long until a rate-limited job is retried.
+from common.clients import CLIPDROP_URL, get_clipdrop_session # Import the shared keep-alive HTTP session for ClipDrop.
+from common.metrics import metrics # Import the shared metrics registry to time ClipDrop requests.
+from text_to_image_generator.image_cache import ImageCache, make_image_key # Import the on-disk cache of generated PNGs.
+from text_to_image_generator.image_variants import ImageVariantPipeline # Import the thumbnail/WebP post-processing stage.
+from text_to_image_generator.job_queue import CANCELLED, DONE, FAILED, ImageJobQueue # Import the background job queue.
 
 # Load environment variables from the .env file.
 # This ensures that sensitive information like API keys are not hardcoded directly into the script.
 load_dotenv()
 CLIP_KEY = os.getenv("CLIPDROP_KEY") # Retrieve the ClipDrop API key from the loaded environment variables.
 
-# Set the title of the Streamlit application that will be displayed on the web page.
-st.title("🖼️ Free Text→Image with ClipDrop")
+APP_NAME = "text_to_image_generator"
+TEXT_TO_IMAGE_ENDPOINT = "/text-to-image/v1"
+# How ClipDrop calls are labelled in the metrics.
+METRICS_MODEL = "clipdrop/text-to-image"
 
-def generate_clipdrop(prompt):
+# Job queue settings: requests in flight at once, retries per prompt, and how often the UI polls.
+IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+IMAGE_JOB_RETRIES = int(os.getenv("IMAGE_JOB_RETRIES", "4"))
+IMAGE_JOB_POLL_SECONDS = 1.0
+GALLERY_COLUMNS = 4
+
+@st.cache_resource()
+def get_image_cache():
+    """
+    Returns the shared on-disk cache of generated images.
+    """
+    return ImageCache()
+
+def generate_clipdrop(prompt, cache=None, use_cache=True, base_url=CLIPDROP_URL):
     """
     Makes a POST request to the ClipDrop Text-to-Image API to generate an image.
 
     Args:
         prompt (str): The text description (prompt) for the image to be generated.
+        cache (ImageCache, optional): Cache of earlier generations; a hit spends no credit.
+        use_cache (bool): False always requests a new image (the result is still cached).
+        base_url (str): The API base URL, e.g. a local fake server when testing.
 
     Returns:
-        PIL.Image.Image: An image object loaded from the API response content.
+        tuple: (PNG bytes, whether they came from the cache). The bytes can be passed
+            straight to st.image, so the image is never decoded on the server.
 
     Raises:
         requests.exceptions.HTTPError: If the API response indicates an error (e.g., bad status code).
         Exception: For other potential errors during the request or image processing.
     """
-    resp = requests.post(
-        "https://clipdrop-api.co/text-to-image/v1", # The API endpoint for text-to-image generation.
-        headers={"x-api-key": CLIP_KEY}, # Set the API key in the request headers for authentication.
-        # 'files' is used because the API expects the prompt as a file-like object,
-        # even though it's just text. (None, prompt) means no filename and just the prompt string.
-        files={"prompt": (None, prompt)},
-        timeout=60 # Set a timeout for the request to prevent it from hanging indefinitely.
+    def call():
+        # Time the request (including failed ones) in the shared metrics.
+        with metrics.timed(APP_NAME, METRICS_MODEL, "http"):
+            # The shared session reuses pooled keep-alive connections and already carries the API key header.
+            resp = get_clipdrop_session(CLIP_KEY).post(
+                f"{base_url}{TEXT_TO_IMAGE_ENDPOINT}", # The API endpoint for text-to-image generation.
+                # 'files' is used because the API expects the prompt as a file-like object,
+                # even though it's just text. (None, prompt) means no filename and just the prompt string.
+                files={"prompt": (None, prompt)},
+                timeout=60 # Set a timeout for the request to prevent it from hanging indefinitely.
+            )
+            resp.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx status codes).
+        return resp.content # The raw PNG bytes, kept encoded.
+
+    if cache is None:
+        return call(), False
+    key = make_image_key(prompt, TEXT_TO_IMAGE_ENDPOINT)
+    return cache.get_or_call(key, call, enabled=use_cache)
+
+@st.cache_resource()
+def get_variant_pipeline():
+    """
+    Returns the process-wide pipeline that builds thumbnails and compressed variants within a memory budget.
+    """
+    # Evicted variants are rebuilt from the original PNG in the image cache.
+    # peek() keeps variant rebuilds and downloads out of the image cache's hit ratio.
+    return ImageVariantPipeline(get_image_cache().peek)
+
+@st.cache_resource()
+def get_job_queue():
+    """
+    Returns the process-wide image job queue, which generates through the shared image cache.
+    """
+    cache = get_image_cache()
+    pipeline = get_variant_pipeline()
+
+    def post_process(job):
+        # Hand the PNG to the variant pipeline and drop it from the job; it stays on disk
+        # in the image cache, so session history only holds small compressed variants.
+        job.key = make_image_key(job.prompt, TEXT_TO_IMAGE_ENDPOINT)
+        pipeline.submit(job.key, job.image)
+        job.image = None
+
+    return ImageJobQueue(
+        lambda prompt, use_cache: generate_clipdrop(prompt, cache=cache, use_cache=use_cache),
+        max_workers=IMAGE_JOB_WORKERS,
+        max_retries=IMAGE_JOB_RETRIES,
+        on_done=post_process,
+        on_retry=lambda job, error: metrics.record_retry(APP_NAME, METRICS_MODEL, "http")
     )
-    resp.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx status codes).
-    # Open the image from the raw byte content of the response.
-    # io.BytesIO creates an in-memory binary stream from the response content.
-    return Image.open(io.BytesIO(resp.content))
+
+@st.fragment(run_every=IMAGE_JOB_POLL_SECONDS)
+def show_jobs():
+    """
+    Polls this session's jobs and shows a thumbnail gallery that fills in as images are ready,
+    without rerunning the whole page. Full-size images are only sent when asked for.
+    """
+    queue = get_job_queue()
+    pipeline = get_variant_pipeline()
+    jobs = queue.jobs(st.session_state.get("image_jobs", []))
+    if not jobs:
+        return
+    finished = sum(job.finished for job in jobs)
+    st.progress(finished / len(jobs), text=f"{finished} of {len(jobs)} images finished")
+
+    # The full-size view of the image selected in the gallery, loaded on demand.
+    selected = next((job for job in jobs if job.key is not None and job.key == st.session_state.get("image_selected")), None)
+    if selected is not None:
+        full = pipeline.get(selected.key, "full", wait=True)
+        if full is not None:
+            st.image(full, caption=selected.prompt, use_container_width=True)
+            # Read once per selection with peek(), so polling neither re-reads the file nor counts as a cache hit.
+            if st.session_state.get("image_selected_png", (None, None))[0] != selected.key:
+                st.session_state["image_selected_png"] = (selected.key, get_image_cache().peek(selected.key))
+            png = st.session_state["image_selected_png"][1]
+            if png is not None:
+                st.download_button("⬇️ Original PNG", data=png, file_name=f"{selected.key[:12]}.png", mime="image/png")
+
+    columns = st.columns(GALLERY_COLUMNS)
+    for index, job in enumerate(jobs):
+        with columns[index % len(columns)]:
+            if job.status == DONE:
+                thumbnail = pipeline.get(job.key, "thumbnail")
+                if thumbnail is not None:
+                    st.image(thumbnail, caption=job.prompt, use_container_width=True)
+                    if st.button("🔍 View", key=f"view_{job.id}"):
+                        st.session_state["image_selected"] = job.key
+                        st.rerun(scope="fragment")
+                elif pipeline.expired(job.key):
+                    st.caption(f"🗑️ {job.prompt} (evicted from the image cache)")
+                else:
+                    st.info(f"🖌️ {job.prompt}: preparing thumbnail")
+                if job.cached:
+                    st.caption("♻️ Served from the image cache (no credit used)")
+            elif job.status == FAILED:
+                st.error(f"{job.prompt}: {job.error}")
+            elif job.status == CANCELLED:
+                st.caption(f"🚫 {job.prompt} (cancelled)")
+            elif job.retry_at is not None:
+                st.warning(f"⏳ {job.prompt}: retrying in {max(0.0, job.retry_at - time.time()):.0f}s ({job.error})")
+            else:
+                st.info(f"🎨 {job.prompt}: {job.status}")
 
 def run():
-    # Create a text input field in the Streamlit application for the user to enter their prompt.
-    prompt = st.text_input("Prompt:")
-
-    # Create a button in the Streamlit application.
-    # The code inside the 'if' block will execute only when this button is clicked.
-    if st.button("Generate"):
-        # Display a spinner with a message while the image is being generated.
-        # This provides visual feedback to the user during the potentially long API call.
-        with st.spinner("Generating... (uses 1 free credit)"):
-            try:
-                # Call the function to generate the image using the user's prompt.
-                img = generate_clipdrop(prompt)
-                # Display the generated image in the Streamlit application.
-                # 'caption' adds text below the image, and 'use_container_width=True' makes the image responsive.
-                st.image(img, caption=prompt, use_container_width=True)
-            except requests.exceptions.HTTPError as e:
-                # Catch specific HTTP errors from the API and display a user-friendly error message
-                # including the status code and response text from the API.
-                st.error(f"API Error {e.response.status_code}: {e.response.text}")
-            except Exception as e:
-                # Catch any other general exceptions that might occur and display a generic error message.
-                st.error(f"Error: {e}")
+    # Set the title of the Streamlit application that will be displayed on the web page.
+    st.title("🖼️ Free Text→Image with ClipDrop")
+
+    # Create a text area in the Streamlit application; every non-empty line is one prompt.
+    prompts = st.text_area("Prompts (one per line):")
+    # Let the user ask for a new image even when this prompt was rendered before.
+    use_cache = st.checkbox("Reuse previous images", value=True)
+    cache = get_image_cache()
+    queue = get_job_queue()
+    st.session_state.setdefault("image_jobs", [])
+
+    generate_col, cancel_col, clear_col = st.columns(3)
+    # Queue the prompts and return immediately; the images fill in below as the jobs finish.
+    if generate_col.button("Generate"):
+        for prompt in (line.strip() for line in prompts.splitlines()):
+            if prompt:
+                st.session_state["image_jobs"].append(queue.submit(prompt, use_cache=use_cache))
+    if cancel_col.button("Cancel queued"):
+        for job_id in st.session_state["image_jobs"]:
+            queue.cancel(job_id)
+    if clear_col.button("Clear finished"):
+        queue.forget(st.session_state["image_jobs"])
+        st.session_state["image_jobs"] = [job.id for job in queue.jobs(st.session_state["image_jobs"])]
+
+    show_jobs()
+
+    stats = cache.stats()
+    queue_stats = queue.stats()
+    variant_stats = get_variant_pipeline().stats()
+    variant_format = f"{variant_stats['format']}, " if variant_stats["format"] else "" # Unknown until a variant is built.
+    st.caption(
+        f"🗃️ Image cache: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['entries']} images ({stats['bytes'] / 1024 / 1024:.1f} MB) · "
+        f"🔁 {queue_stats['retries']} retries ({queue_stats['rate_limited']} rate limited) · "
+        f"🧮 Variants: {variant_stats['bytes'] / 1024 / 1024:.1f} of {variant_stats['max_bytes'] / 1024 / 1024:.0f} MB "
+        f"({variant_format}{variant_stats['evictions']} evicted)"
+    )
 
 if __name__=="__main__":
-    run()
\ No newline at end of file
+    run()